@@ -2,12 +2,128 @@
 
 """
 
-from flask import request
+from abc import ABCMeta, abstractmethod
+from flask import current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.http import quote_etag
 from flask_io import errors
+from inspect import isawaitable, iscoroutinefunction
+from .utils import get_timings, unpack
+
+
+class Step(metaclass=ABCMeta):
+    """
+    A step declared by a FlaskIO decorator.
+
+    The decorators still wrap the function, so it works on its own, but the steps
+    are compiled into a single `Action` when the application is set up.
+    """
+
+    wrapper = None
+
+    def bind(self, wrapper):
+        """
+        Binds the step to the wrapper function created by the decorator.
+
+        :param wrapper: The wrapper function.
+        :return: The wrapper function.
+        """
+        self.wrapper = wrapper
+        wrapper.io_step = self
+        return wrapper
+
+    @abstractmethod
+    def describe(self):
+        """
+        Describes the step.
+
+        :return dict: The description.
+        """
+        pass
+
+
+class Input(Step):
+    """
+    A function parameter parsed from the request.
+    """
+
+    def __init__(self, param_name, location, parse, getter_data=None, source=None):
+        """
+        Initializes a new instance of `Input`.
+
+        :param str param_name: The parameter which receives the argument.
+        :param str location: The location of the argument in the request.
+        :param parse: A function that receives the data returned by `getter_data` and returns the argument.
+        :param getter_data: A function that returns the data from the request, e.g. `request.args`.
+        :param source: The field or schema used to parse the argument.
+        """
+        self.param_name = param_name
+        self.location = location
+        self.parse = parse
+        self.getter_data = getter_data
+        self.source = source
+
+    def __call__(self):
+        return self.parse(self.getter_data() if self.getter_data else None)
+
+    def describe(self):
+        return dict(name=self.param_name, location=self.location, type=_type_name(self.source))
+
+
+class Output(Step):
+    """
+    The marshalling applied to the value returned by the function.
+    """
+
+    def __init__(self, dump, schema=None, **options):
+        """
+        Initializes a new instance of `Output`.
+
+        :param dump: A function that receives the value returned and returns the marshalled value.
+        :param schema: The schema used to serialize the value.
+        :param options: Any other option to be described.
+        """
+        self.dump = dump
+        self.schema = schema
+        self.options = options
+
+    def __call__(self, data):
+        return self.dump(data)
+
+    def describe(self):
+        description = dict(schema=_type_name(self.schema))
+        description.update(self.options)
+        return description
+
+
+def unwrap_steps(func):
+    """
+    Gets the function wrapped by the FlaskIO decorators and the steps declared.
+
+    The unwrapping stops at the first wrapper which has not been created by FlaskIO,
+    the steps inside of it keep being performed by their wrappers.
+
+    :param func: The function decorated.
+    :return: A tuple with the inner function and the steps from the outermost to innermost.
+    """
+    steps = []
+
+    while True:
+        step = getattr(func, 'io_step', None)
+
+        # functools.wraps copies the attributes of the wrapped function
+        # so the step must be bound to this very function.
+        if step is None or step.wrapper is not func:
+            break
+
+        steps.append(step)
+        func = func.__wrapped__
+
+    return func, steps
 
 
 class Action(object):
-    def __init__(self, func, default_authenticators, default_permissions, trace_enabled):
+    def __init__(self, func, default_authenticators, default_permissions, trace_enabled, trace_sample_rate=None):
         self.func = func
 
         self.authenticators = default_authenticators
@@ -18,13 +134,163 @@ class Action(object):
         if hasattr(func, 'permissions'):
             self.permissions = func.permissions
 
+        self.response_cache = getattr(func, 'response_cache', None)
+        self.etag = getattr(func, 'etag', None)
+
         self.trace_enabled = trace_enabled
+        self.trace_sample_rate = trace_sample_rate
+
+        self.view, steps = unwrap_steps(func)
+
+        # outputs are applied from the innermost to the outermost decorator.
+        self.inputs = [step for step in steps if isinstance(step, Input)]
+        self.outputs = [step for step in reversed(steps) if isinstance(step, Output)]
+
+        # inputs are grouped by their location,
+        # so each source of data is read once per request.
+        groups = {}
+        self.sources = []
+        for step in self.inputs:
+            parsers = groups.get(step.location)
+            if parsers is None:
+                parsers = groups[step.location] = []
+                self.sources.append((step.getter_data, parsers))
+            parsers.append((step.param_name, step.parse))
+
+        # the whole action runs in a event loop if the view,
+        # any authenticator or permission is a coroutine function.
+        self.is_async = iscoroutinefunction(self.view) or \
+            any(iscoroutinefunction(authenticator.authenticate) for authenticator in self.authenticators) or \
+            any(iscoroutinefunction(permission.has_permission) for permission in self.permissions)
 
     def __call__(self, *args, **kwargs):
-        self.perform_authentication()
-        self.perform_authorization()
+        if self.is_async:
+            return current_app.ensure_sync(self.call_async)(*args, **kwargs)
+
+        timings = get_timings()
+
+        with timings.phase('auth'):
+            with timings.phase('auth.authentication'):
+                self.perform_authentication()
+            with timings.phase('auth.permissions'):
+                self.perform_authorization()
+
+        if self.response_cache is not None:
+            response = self.response_cache.get()
+            if response is not None:
+                return response
+
+        with timings.phase('parse'):
+            self.perform_parsing(kwargs)
+
+        etag = None
+        if self.etag is not None:
+            etag = self.etag(*args, **kwargs)
+            if etag is not None and self.is_not_modified(etag):
+                return self.not_modified(etag)
+
+        with timings.phase('view'):
+            data = self.view(*args, **kwargs)
+
+        with timings.phase('marshal'):
+            for output in self.outputs:
+                data = output.dump(data)
+
+        if etag is not None:
+            data = self.add_etag(data, etag)
+
+        return data
+
+    async def call_async(self, *args, **kwargs):
+        """
+        Performs the action awaiting the view, authenticators and permissions which are coroutines.
+        """
+        timings = get_timings()
+
+        with timings.phase('auth'):
+            with timings.phase('auth.authentication'):
+                await self.perform_authentication_async()
+            with timings.phase('auth.permissions'):
+                await self.perform_authorization_async()
+
+        if self.response_cache is not None:
+            response = self.response_cache.get()
+            if response is not None:
+                return response
+
+        with timings.phase('parse'):
+            self.perform_parsing(kwargs)
 
-        return self.func(*args, **kwargs)
+        etag = None
+        if self.etag is not None:
+            etag = self.etag(*args, **kwargs)
+            if isawaitable(etag):
+                etag = await etag
+            if etag is not None and self.is_not_modified(etag):
+                return self.not_modified(etag)
+
+        with timings.phase('view'):
+            data = self.view(*args, **kwargs)
+            if isawaitable(data):
+                data = await data
+
+        with timings.phase('marshal'):
+            for output in self.outputs:
+                data = output.dump(data)
+
+        if etag is not None:
+            data = self.add_etag(data, etag)
+
+        return data
+
+    def is_not_modified(self, etag):
+        """
+        Checks if the client has the version of the given ETag.
+        """
+        return request.method in ('GET', 'HEAD') and request.if_none_match.contains_weak(str(etag))
+
+    def not_modified(self, etag):
+        """
+        Creates a response 304 for the given ETag.
+        """
+        response = current_app.response_class(status=304)
+        response.set_etag(str(etag), weak=True)
+        return response
+
+    def add_etag(self, data, etag):
+        """
+        Adds the given ETag to the value returned by the view.
+        """
+        if isinstance(data, current_app.response_class):
+            data.set_etag(str(etag), weak=True)
+            return data
+
+        status = headers = None
+        if isinstance(data, tuple):
+            data, status, headers = unpack(data)
+
+        headers = Headers(headers)
+        headers.set('ETag', quote_etag(str(etag), weak=True))
+
+        return data, status, headers
+
+    def describe(self):
+        """
+        Describes what is performed on every request.
+
+        :return dict: The description.
+        """
+        return dict(
+            view=getattr(self.view, '__qualname__', repr(self.view)),
+            authenticators=[_type_name(authenticator) for authenticator in self.authenticators],
+            permissions=[_type_name(permission) for permission in self.permissions],
+            inputs=[step.describe() for step in self.inputs],
+            outputs=[step.describe() for step in self.outputs],
+            cache=dict(ttl=self.response_cache.ttl, vary_on=self.response_cache.vary_on,
+                       tags=self.response_cache.tags) if self.response_cache else None,
+            is_async=self.is_async,
+            trace_enabled=self.trace_enabled
+        )
 
     def perform_authentication(self):
         """
@@ -57,3 +323,60 @@ class Action(object):
                     raise errors.PermissionDenied()
                 else:
                     raise errors.NotAuthenticated()
+
+    async def perform_authentication_async(self):
+        """
+        Perform authentication on the incoming request, awaiting the authenticators which are coroutines.
+        """
+
+        if not self.authenticators:
+            return
+
+        request.user = None
+        request.auth = None
+
+        for authenticator in self.authenticators:
+            auth_tuple = authenticator.authenticate()
+            if isawaitable(auth_tuple):
+                auth_tuple = await auth_tuple
+
+            if auth_tuple:
+                request.user = auth_tuple[0]
+                request.auth = auth_tuple[1]
+                break
+
+    async def perform_authorization_async(self):
+        """
+        Check if the request should be permitted, awaiting the permissions which are coroutines.
+        Raises an appropriate exception if the request is not permitted.
+        """
+
+        for permission in self.permissions:
+            has_permission = permission.has_permission()
+            if isawaitable(has_permission):
+                has_permission = await has_permission
+
+            if not has_permission:
+                if request.user:
+                    raise errors.PermissionDenied()
+                else:
+                    raise errors.NotAuthenticated()
+
+    def perform_parsing(self, kwargs):
+        """
+        Parses the arguments declared from the request into the given keyword arguments.
+
+        :param dict kwargs: The keyword arguments of the function.
+        """
+
+        for getter_data, parsers in self.sources:
+            data = getter_data() if getter_data else None
+
+            for param_name, parse in parsers:
+                kwargs[param_name] = parse(data)
+
+
+def _type_name(obj):
+    if obj is None:
+        return None
+    return obj.__name__ if isinstance(obj, type) else type(obj).__name__
@@ -2,7 +2,13 @@
 Provides various authentication policies.
 """
 
+import hashlib
+
 from abc import ABCMeta, abstractmethod
+from flask import request
+from inspect import isclass, iscoroutinefunction
+from .errors import AuthenticationFailed
+from .utils import LRUCache
 
 
 class Authenticator(metaclass=ABCMeta):
@@ -14,5 +20,131 @@ class Authenticator(metaclass=ABCMeta):
     def authenticate(self):
         """
         Authenticate the request and return a two-tuple of (user, token).
+        It can be a coroutine function as well.
         """
         pass
+
+
+class CachedAuthenticator(Authenticator):
+    """
+    Wraps an authenticator and caches the `(user, auth)` tuple by the fingerprint of the credentials,
+    so the wrapped authenticator is only called once per credentials while they are cached.
+
+    The credentials are hashed before being used as key, so they are not kept in memory.
+    """
+
+    def __init__(self, authenticator, ttl=60, max_size=1024, negative_ttl=None, credentials=None):
+        """
+        Initializes a new instance of `CachedAuthenticator`.
+
+        :param authenticator: The authenticator instance or class to be cached.
+        :param float ttl: The number of seconds an authentication is cached.
+        :param int max_size: The maximum number of credentials cached, the least recently used are evicted.
+        :param float negative_ttl: The number of seconds the invalid credentials are cached,
+                                   `None` to not cache them.
+        :param credentials: A function which returns the credentials of the request,
+                            the Authorization header is used by default.
+                            The request is not cached if it returns `None`.
+        """
+        self.authenticator = authenticator() if isclass(authenticator) else authenticator
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.credentials = credentials or _get_authorization
+        self.cache = LRUCache(max_size)
+
+        if iscoroutinefunction(self.authenticator.authenticate):
+            self.authenticate = self.authenticate_async
+
+    def authenticate(self):
+        key = self.__get_key()
+
+        if key is None:
+            return self.authenticator.authenticate()
+
+        entry = self.cache.get(key, _missing)
+        if entry is not _missing:
+            return self.__get_result(entry)
+
+        try:
+            result = self.authenticator.authenticate()
+        except AuthenticationFailed as e:
+            self.__set_error(key, e)
+            raise
+
+        self.__set_result(key, result)
+        return result
+
+    async def authenticate_async(self):
+        """
+        Same as `authenticate` for authenticators whose `authenticate` is a coroutine function.
+        """
+        key = self.__get_key()
+
+        if key is None:
+            return await self.authenticator.authenticate()
+
+        entry = self.cache.get(key, _missing)
+        if entry is not _missing:
+            return self.__get_result(entry)
+
+        try:
+            result = await self.authenticator.authenticate()
+        except AuthenticationFailed as e:
+            self.__set_error(key, e)
+            raise
+
+        self.__set_result(key, result)
+        return result
+
+    def revoke(self, credentials):
+        """
+        Removes the given credentials from the cache, e.g. when a token is revoked.
+
+        :param credentials: The credentials as returned by the `credentials` function.
+        """
+        self.cache.pop(_fingerprint(credentials))
+
+    def clear(self):
+        """
+        Removes all the credentials from the cache.
+        """
+        self.cache.clear()
+
+    def __get_key(self):
+        credentials = self.credentials()
+        if credentials is None:
+            return None
+        return _fingerprint(credentials)
+
+    def __get_result(self, entry):
+        result, error = entry
+        if error is not None:
+            # the traceback of the previous request is not kept.
+            raise error.with_traceback(None)
+        return result
+
+    def __set_result(self, key, result):
+        # an authenticator which does not recognize the credentials returns none.
+        if result:
+            self.cache.set(key, (result, None), self.ttl)
+        elif self.negative_ttl:
+            self.cache.set(key, (result, None), self.negative_ttl)
+
+    def __set_error(self, key, error):
+        if self.negative_ttl:
+            self.cache.set(key, (None, error), self.negative_ttl)
+
+
+_missing = object()
+
+
+def _get_authorization():
+    return request.headers.get('Authorization')
+
+
+def _fingerprint(credentials):
+    if isinstance(credentials, str):
+        credentials = credentials.encode('utf-8')
+    elif not isinstance(credentials, bytes):
+        credentials = repr(credentials).encode('utf-8')
+    return hashlib.sha256(credentials).digest()
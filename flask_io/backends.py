@@ -0,0 +1,198 @@
+"""
+JSON backends used by the JSON parser and renderer to encode and decode documents.
+
+The backend is chosen once, the fastest library installed is used when `auto` is specified.
+"""
+
+import dataclasses
+import decimal
+import uuid
+
+from abc import ABCMeta, abstractmethod
+from datetime import date
+from flask import current_app, has_app_context, json
+from werkzeug.http import http_date
+
+
+class JSONBackend(metaclass=ABCMeta):
+    """
+    Base class for all JSON backends.
+    """
+
+    name = None
+
+    @abstractmethod
+    def loads(self, data, encoding='utf-8'):
+        """
+        Decodes a byte array containing a JSON document into a Python object.
+        :param data: The byte array (or memoryview) containing a JSON document.
+        :param str encoding: The encoding of the data.
+        :return: A Python object.
+        """
+        pass
+
+    @abstractmethod
+    def dumps(self, data, indent=None, encoding='utf-8'):
+        """
+        Encodes a Python object into a byte array containing a JSON document.
+        :param data: The Python object.
+        :param int indent: The number of spaces used to indent the document.
+        :param str encoding: The encoding of the byte array.
+        :return: A byte array.
+        """
+        pass
+
+
+class FlaskJSONBackend(JSONBackend):
+    """
+    Backend which uses the Flask JSON provider, it honours the app's JSON settings.
+    """
+
+    name = 'stdlib'
+
+    def loads(self, data, encoding='utf-8'):
+        return json.loads(bytes(data).decode(encoding))
+
+    def dumps(self, data, indent=None, encoding='utf-8'):
+        return json.dumps(data, indent=indent).encode(encoding)
+
+
+class OrjsonBackend(JSONBackend):
+    """
+    Backend which uses `orjson`, it reads and writes UTF-8 bytes without intermediate strings.
+
+    `orjson` only supports an indentation of 2 spaces, any indent requested produces it.
+    Dates are encoded by `default_encoder` and the keys are sorted if the app's JSON provider
+    sorts them, so the output is the same as the Flask JSON provider's.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def loads(self, data, encoding='utf-8'):
+        if not _is_utf8(encoding):
+            data = bytes(data).decode(encoding)
+        return self.orjson.loads(data)
+
+    def dumps(self, data, indent=None, encoding='utf-8'):
+        option = self.orjson.OPT_NON_STR_KEYS | self.orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= self.orjson.OPT_INDENT_2
+        if has_app_context() and _sort_keys():
+            option |= self.orjson.OPT_SORT_KEYS
+
+        ret = self.orjson.dumps(data, default=default_encoder, option=option)
+
+        if not _is_utf8(encoding):
+            ret = ret.decode('utf-8').encode(encoding)
+        return ret
+
+
+class UjsonBackend(JSONBackend):
+    """
+    Backend which uses `ujson`.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def loads(self, data, encoding='utf-8'):
+        return self.ujson.loads(bytes(data).decode(encoding))
+
+    def dumps(self, data, indent=None, encoding='utf-8'):
+        return self.ujson.dumps(data, indent=indent or 0, default=default_encoder).encode(encoding)
+
+
+class SimplejsonBackend(JSONBackend):
+    """
+    Backend which uses `simplejson`.
+    """
+
+    name = 'simplejson'
+
+    def __init__(self):
+        import simplejson
+        self.simplejson = simplejson
+
+    def loads(self, data, encoding='utf-8'):
+        return self.simplejson.loads(bytes(data).decode(encoding))
+
+    def dumps(self, data, indent=None, encoding='utf-8'):
+        return self.simplejson.dumps(data, indent=indent, default=default_encoder).encode(encoding)
+
+
+backends = {
+    FlaskJSONBackend.name: FlaskJSONBackend,
+    OrjsonBackend.name: OrjsonBackend,
+    UjsonBackend.name: UjsonBackend,
+    SimplejsonBackend.name: SimplejsonBackend,
+}
+
+
+def get_json_backend(backend=None):
+    """
+    Gets a JSON backend.
+
+    :param backend: A `JSONBackend` instance, the name of a backend or `auto` to pick the fastest library installed.
+                    The Flask JSON provider is used if it is `None`.
+    :return JSONBackend: The JSON backend.
+    """
+    if isinstance(backend, JSONBackend):
+        return backend
+
+    if backend is None:
+        return FlaskJSONBackend()
+
+    if backend == 'auto':
+        for backend_class in (OrjsonBackend, UjsonBackend, SimplejsonBackend):
+            try:
+                return backend_class()
+            except ImportError:
+                pass
+        return FlaskJSONBackend()
+
+    if backend not in backends:
+        raise ValueError('Unknown JSON backend: %s' % backend)
+
+    return backends[backend]()
+
+
+def _sort_keys():
+    # the JSON provider only exists since Flask 2.2, before the keys are sorted by JSON_SORT_KEYS.
+    provider = getattr(current_app, 'json', None)
+
+    if provider is not None:
+        return getattr(provider, 'sort_keys', False)
+
+    # sorted unless disabled, as Flask does by default.
+    return current_app.config.get('JSON_SORT_KEYS') is not False
+
+
+def _is_utf8(encoding):
+    return encoding.lower().replace('-', '') == 'utf8'
+
+
+def default_encoder(o):
+    """
+    Encodes the types supported by the Flask JSON provider but not by the JSON libraries,
+    it is also used by the binary renderers.
+    """
+    if isinstance(o, date):
+        return http_date(o)
+
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+
+    raise TypeError('Object of type %s is not JSON serializable' % type(o).__name__)
@@ -0,0 +1,163 @@
+"""
+Batch endpoint which performs several requests in a single HTTP call.
+"""
+
+import atexit
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import json, request
+from marshmallow import Schema, fields, validate
+from threading import Lock
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from .errors import BadRequest
+
+
+class BatchItemSchema(Schema):
+    """
+    A request in a batch.
+    """
+
+    method = fields.String(load_default='GET', validate=validate.OneOf(['GET', 'POST', 'PUT', 'PATCH', 'DELETE']))
+    path = fields.String(required=True, validate=validate.Length(min=1))
+    query = fields.Dict(keys=fields.String(), load_default=None)
+    headers = fields.Dict(keys=fields.String(), values=fields.String(), load_default=None)
+    body = fields.Raw(load_default=None, allow_none=True)
+
+
+class BatchEndpoint(object):
+    """
+    Dispatches every request of a batch to the view function of its endpoint.
+
+    Every request is dispatched by Flask as a regular request, so the `before_request`
+    and `after_request` functions are called as well as the FlaskIO parsing, authentication and marshalling.
+    The responses are returned as a JSON array of `{"status": ..., "body": ...}` in the same order.
+    """
+
+    def __init__(self, app, endpoint, max_items=50, parallel=False, max_workers=None,
+                 inherit_headers=('Authorization', 'Cookie', 'Accept-Language')):
+        """
+        Initializes a new instance of `BatchEndpoint`.
+
+        :param app: The Flask application.
+        :param str endpoint: The endpoint of the batch itself, it cannot be called from a batch.
+        :param int max_items: The maximum number of requests in a batch.
+        :param bool parallel: Indicates whether the requests are performed in parallel in a thread pool,
+                              it should only be used if the requests do not depend on each other.
+        :param int max_workers: The maximum number of threads used to perform the requests in parallel.
+        :param inherit_headers: The headers of the batch request which are sent to every request.
+        """
+        self.app = app
+        self.endpoint = endpoint
+        self.max_items = max_items
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.inherit_headers = inherit_headers
+
+        self.__executor = None
+        self.__lock = Lock()
+
+        atexit.register(self.close)
+
+    def __call__(self, items):
+        """
+        Performs the given requests.
+
+        :param list items: The requests deserialized by `BatchItemSchema`.
+        :return: A Flask response.
+        """
+        if len(items) > self.max_items:
+            raise BadRequest('A batch cannot have more than %d requests.' % self.max_items)
+
+        headers = [(key, request.headers[key]) for key in self.inherit_headers if key in request.headers]
+        base_url = request.host_url
+
+        if self.parallel and len(items) > 1:
+            executor = self.__get_executor()
+            results = list(executor.map(lambda item: self.dispatch(item, headers, base_url), items))
+        else:
+            results = [self.dispatch(item, headers, base_url) for item in items]
+
+        return self.app.response_class(b'[' + b','.join(results) + b']', mimetype='application/json')
+
+    def close(self):
+        """
+        Shuts down the thread pool used to perform the requests in parallel.
+        """
+        with self.__lock:
+            executor = self.__executor
+            self.__executor = None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def dispatch(self, item, headers, base_url):
+        """
+        Performs a request of the batch.
+
+        :param dict item: The request deserialized by `BatchItemSchema`.
+        :param headers: The headers inherited from the batch request.
+        :param str base_url: The base url of the batch request.
+        :return: The response as a JSON document.
+        """
+        item_headers = [('Accept', 'application/json')] + headers + list((item['headers'] or {}).items())
+
+        # the responses are embedded into the batch response, they must not be compressed.
+        item_headers = [(key, value) for key, value in item_headers if key.lower() != 'accept-encoding']
+
+        builder = EnvironBuilder(path=item['path'], base_url=base_url, method=item['method'],
+                                 query_string=item['query'], headers=item_headers,
+                                 json=item['body'] if item['body'] is not None else None)
+
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        with self.app.request_context(environ) as ctx:
+            try:
+                if ctx.request.routing_exception is not None:
+                    raise ctx.request.routing_exception
+
+                endpoint = ctx.request.url_rule.endpoint
+
+                if endpoint == self.endpoint:
+                    raise BadRequest('A batch cannot be called from a batch.')
+
+                # the before and after request functions are called, e.g. authorization hooks.
+                response = self.app.full_dispatch_request()
+            except BadRequest as e:
+                return self.__render(e.status_code, json.dumps(e.error.as_dict()).encode())
+            except HTTPException as e:
+                return self.__render(e.code, None)
+            except Exception:
+                # an error raised by a view which does not use FlaskIO only fails its own request.
+                self.app.log_exception(sys.exc_info())
+                return self.__render(500, None)
+
+            return self.__render(response.status_code, self.__get_body(response))
+
+    def __get_executor(self):
+        if self.__executor is not None:
+            return self.__executor
+
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='flask-io-batch')
+            return self.__executor
+
+    def __get_body(self, response):
+        data = response.get_data()
+
+        if not data:
+            return None
+
+        # JSON documents are embedded as they are rather than parsed and rendered again.
+        if response.mimetype == 'application/json' or response.mimetype.endswith('+json'):
+            return data
+
+        return json.dumps(data.decode(response.charset, 'replace')).encode()
+
+    def __render(self, status, body):
+        return b'{"status":%d,"body":%s}' % (status, body if body is not None else b'null')
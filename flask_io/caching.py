@@ -0,0 +1,246 @@
+"""
+Caching of the rendered responses.
+"""
+
+from abc import ABCMeta, abstractmethod
+from flask import current_app, request
+from logging import getLogger
+from threading import RLock
+from .utils import LRUCache
+
+
+class CacheBackend(metaclass=ABCMeta):
+    """
+    Base class for all cache backends.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """
+        Gets the entry cached for the given key.
+        :param key: The key.
+        :return: The entry or `None` if it is not found.
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key, entry, ttl=None, tags=()):
+        """
+        Caches the given entry.
+        :param key: The key.
+        :param entry: The entry to be cached.
+        :param float ttl: The number of seconds the entry lives.
+        :param tags: The tags used to invalidate the entry.
+        """
+        pass
+
+    @abstractmethod
+    def invalidate(self, *tags):
+        """
+        Removes the entries with any of the given tags.
+        :param tags: The tags.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """
+        Removes all the entries.
+        """
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """
+    A cache backend which keeps the entries in process, the least recently used entries are evicted.
+
+    The tags of every entry are kept with it, so the tag index is cleaned up when the entry
+    is evicted, expires or is replaced.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        """
+        Initializes a new instance of `MemoryCache`.
+        :param int max_size: The maximum number of entries.
+        :param float ttl: The default number of seconds an entry lives.
+        """
+        self.entries = LRUCache(max_size, ttl, self.__remove_tags)
+        self.__tags = {}
+        # reentrant as the entries are removed from the index by `entries` while `set` holds it.
+        self.__lock = RLock()
+
+    @property
+    def hits(self):
+        return self.entries.hits
+
+    @property
+    def misses(self):
+        return self.entries.misses
+
+    def get(self, key):
+        value = self.entries.get(key)
+        return None if value is None else value[0]
+
+    def set(self, key, entry, ttl=None, tags=()):
+        tags = tuple(tags)
+
+        # the entry replaced and the entries evicted are removed from the index
+        # while the lock is held, before the tags of the new entry are added.
+        with self.__lock:
+            self.entries.set(key, (entry, tags), ttl)
+
+            for tag in tags:
+                self.__tags.setdefault(tag, set()).add(key)
+
+    def invalidate(self, *tags):
+        with self.__lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self.__tags.pop(tag, ()))
+
+        for key in keys:
+            self.entries.pop(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__tags.clear()
+        self.entries.clear()
+
+    def __remove_tags(self, key, value):
+        _, tags = value
+
+        if not tags:
+            return
+
+        with self.__lock:
+            for tag in tags:
+                keys = self.__tags.get(tag)
+                if keys is None:
+                    continue
+
+                keys.discard(key)
+
+                if not keys:
+                    del self.__tags[tag]
+
+
+class CachedResponse(object):
+    """
+    A rendered response kept in the cache.
+    """
+
+    __slots__ = ('data', 'status', 'headers')
+
+    def __init__(self, data, status, headers):
+        self.data = data
+        self.status = status
+        self.headers = headers
+
+
+class ResponseCache(object):
+    """
+    Caches the rendered responses of an endpoint.
+
+    The key is made of the endpoint, its URL arguments, the query string, the request Accept
+    and Accept-Encoding headers, so every compressed variant is cached, and the values listed in `vary_on`:
+
+     * `query`: the query string, it is always part of the key.
+     * `user:<attribute>`: an attribute of the user authenticated which identifies it, e.g. `user:id`.
+     * `header:<name>`: the value of a header.
+     * a function which returns any hashable value.
+    """
+
+    def __init__(self, backend, ttl=None, vary_on=(), tags=()):
+        """
+        Initializes a new instance of `ResponseCache`.
+
+        :param CacheBackend backend: The backend which keeps the responses.
+        :param float ttl: The number of seconds a response lives.
+        :param vary_on: The values which the response depends on, see above.
+        :param tags: The tags used to invalidate the responses, they are formatted with the URL arguments,
+                     e.g. `user:{username}`.
+        """
+        for vary in vary_on:
+            if vary == 'user':
+                # the string of two users may be the same, an attribute which identifies them is required.
+                raise ValueError('Invalid vary_on value: user, use user:<attribute> or a function')
+
+            if not callable(vary) and vary != 'query' and not vary.startswith(('header:', 'user:')):
+                raise ValueError('Invalid vary_on value: %s' % vary)
+
+        self.backend = backend
+        self.ttl = ttl
+        self.vary_on = tuple(vary_on)
+        self.tags = tuple(tags)
+
+    def get(self):
+        """
+        Gets the response cached for the current request.
+
+        :return: A Flask response or `None` if the request cannot be served from the cache.
+        """
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        key = self.get_key()
+        request.environ['flask_io.cache_key'] = key
+
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+
+        request.environ['flask_io.cache_hit'] = True
+
+        return current_app.response_class(entry.data, status=entry.status, headers=entry.headers)
+
+    def set(self, response):
+        """
+        Caches the given response if it has been rendered for the current request.
+
+        :param response: The Flask response.
+        """
+        key = request.environ.get('flask_io.cache_key')
+
+        if key is None or request.environ.get('flask_io.cache_hit'):
+            return
+
+        if response.status_code != 200 or response.is_streamed:
+            return
+
+        view_args = request.view_args or {}
+
+        try:
+            tags = [tag.format(**view_args) for tag in self.tags]
+        except (KeyError, IndexError, ValueError):
+            # the response could not be invalidated, so it is not cached.
+            getLogger('flask-io').exception('Failed to format the cache tags of %s.', request.endpoint)
+            return
+
+        entry = CachedResponse(response.get_data(), response.status_code, list(response.headers.items()))
+        self.backend.set(key, entry, self.ttl, tags)
+
+    def get_key(self):
+        """
+        Gets the cache key of the current request.
+
+        :return: A tuple.
+        """
+        # the query string is always part of the key, so the arguments parsed from it, valid or not,
+        # do not share a response.
+        key = [request.endpoint, request.headers.get('Accept'), request.headers.get('Accept-Encoding'),
+               tuple(sorted(request.args.items(multi=True)))]
+
+        if request.view_args:
+            key.append(tuple(sorted(request.view_args.items())))
+
+        for vary in self.vary_on:
+            if callable(vary):
+                key.append(vary())
+            elif vary == 'query':
+                continue
+            elif vary.startswith('user:'):
+                key.append(getattr(getattr(request, 'user', None), vary[5:], None))
+            else:
+                key.append(request.headers.get(vary[7:]))
+
+        return tuple(key)
@@ -0,0 +1,462 @@
+"""
+Compiles marshmallow schemas into specialized functions which skip the generic field machinery.
+
+The compiled functions produce the same output as the schema, a schema which cannot be compiled
+is returned as it is, so the result can always be used in place of the schema.
+
+The compiled loaders only handle valid data, as soon as something is invalid
+the data is loaded again by the schema, so the errors are exactly the same.
+"""
+
+import uuid
+
+from collections.abc import Mapping
+from marshmallow import EXCLUDE, INCLUDE, RAISE, Schema, ValidationError, fields as ma_fields
+from marshmallow.decorators import POST_DUMP, POST_LOAD, PRE_DUMP, PRE_LOAD, VALIDATES, VALIDATES_SCHEMA
+from marshmallow.fields import Field
+from marshmallow.utils import get_value, is_collection, missing, set_value
+from . import fields
+from .validate import Length
+
+
+# fields which return the value as it is when it already has the given type.
+_identity_types = {
+    ma_fields.String: str,
+    ma_fields.Email: str,
+    ma_fields.Url: str,
+    fields.String: str,
+    ma_fields.Integer: int,
+    ma_fields.Float: float,
+    ma_fields.Boolean: bool,
+}
+
+
+class CompiledDumper(object):
+    """
+    Serializes objects like `Schema.dump` through a plan built once from the schema's fields.
+    """
+
+    def __init__(self, schema, plan):
+        """
+        Initializes a new instance of `CompiledDumper`.
+
+        :param schema: The schema compiled.
+        :param plan: A list of `(key, attr_name, check_key, default, serialize, field)`,
+                     the fields without a `serialize` function are serialized by marshmallow.
+        """
+        self.schema = schema
+        self.many = schema.many
+        self.plan = plan
+        self.dict_class = schema.dict_class
+
+    def dump(self, obj, many=None):
+        """
+        Serializes the given object.
+
+        :param obj: The object or the collection of objects.
+        :param bool many: Whether the object is a collection, the schema's `many` is used if it is `None`.
+        :return: The serialized data.
+        """
+        many = self.many if many is None else bool(many)
+
+        if many and obj is not None:
+            dump_one = self.dump_one
+            return [dump_one(item) for item in obj]
+
+        return self.dump_one(obj)
+
+    def dump_one(self, obj):
+        ret = self.dict_class()
+
+        is_dict = type(obj) is dict
+        has_getitem = is_dict or hasattr(obj, '__getitem__')
+        get_attribute = self.schema.get_attribute
+
+        for key, attr_name, check_key, default, serialize, field in self.plan:
+            if serialize is None:
+                value = field.serialize(attr_name, obj, accessor=get_attribute)
+                if value is not missing:
+                    ret[key] = value
+                continue
+
+            # same lookup order as marshmallow: obj[key] first then obj.key.
+            if is_dict:
+                value = obj.get(check_key, missing)
+                if value is missing:
+                    value = getattr(obj, check_key, missing)
+            elif has_getitem:
+                value = get_value(obj, check_key, missing)
+            else:
+                value = getattr(obj, check_key, missing)
+
+            if value is missing:
+                value = default() if callable(default) else default
+                if value is missing:
+                    continue
+
+            ret[key] = serialize(value, attr_name, obj)
+
+        return ret
+
+
+def compile_dumper(schema, _compiling=()):
+    """
+    Compiles the serialization of the given schema.
+
+    Schemas with `pre_dump`/`post_dump` hooks or which override how the attributes are read
+    are not compiled, neither the fields which override `serialize` or `get_value`,
+    e.g. `Method`, `Function` and fields with a dotted `attribute`.
+
+    :param schema: The schema instance.
+    :return: A `CompiledDumper` or the schema itself if it cannot be compiled.
+    """
+    try:
+        return _compile_dumper(schema, _compiling)
+    except Exception:
+        # e.g. a nested schema given by name which is not registered yet,
+        # the schema raises the error itself if it is still missing when it dumps.
+        return schema
+
+
+def _compile_dumper(schema, _compiling):
+    schema_class = type(schema)
+
+    if schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP] or \
+            schema_class.get_attribute is not Schema.get_attribute or \
+            schema_class.dump is not Schema.dump or \
+            schema_class._serialize is not Schema._serialize:
+        return schema
+
+    # a schema nested in itself is left to marshmallow at the second level.
+    _compiling = _compiling + (schema_class,)
+
+    plan = []
+    compiled = False
+
+    for attr_name, field in schema.dump_fields.items():
+        key = field.data_key if field.data_key is not None else attr_name
+        check_key = attr_name if field.attribute is None else field.attribute
+
+        serialize = None
+
+        if _is_compilable(field) and '.' not in check_key:
+            serialize = _compile_field(field, _compiling)
+
+        if serialize is not None:
+            compiled = True
+
+        plan.append((key, attr_name, check_key, field.dump_default, serialize, field))
+
+    if not compiled:
+        return schema
+
+    return CompiledDumper(schema, plan)
+
+
+def _is_compilable(field):
+    field_class = type(field)
+    return field._CHECK_ATTRIBUTE and \
+        field_class.serialize is Field.serialize and \
+        field_class.get_value is Field.get_value
+
+
+def _compile_field(field, compiling):
+    """
+    Gets a function which does the same as `field._serialize`.
+    """
+    field_class = type(field)
+
+    identity_type = _identity_types.get(field_class)
+
+    if identity_type is not None and not getattr(field, 'as_string', False):
+        field_serialize = field._serialize
+
+        def serialize(value, attr, obj):
+            if type(value) is identity_type:
+                return value
+            return field_serialize(value, attr, obj)
+        return serialize
+
+    if field_class is ma_fields.Raw:
+        return lambda value, attr, obj: value
+
+    if field_class is ma_fields.Nested:
+        nested_schema = field.schema
+
+        if type(nested_schema) in compiling:
+            return field._serialize
+
+        nested_dumper = compile_dumper(nested_schema, compiling)
+        many = nested_schema.many or field.many
+
+        def serialize(value, attr, obj):
+            if value is None:
+                return None
+            return nested_dumper.dump(value, many=many)
+        return serialize
+
+    if field_class is ma_fields.List:
+        inner_serialize = _compile_field(field.inner, compiling)
+
+        def serialize(value, attr, obj):
+            if value is None:
+                return None
+            return [inner_serialize(each, attr, obj) for each in value]
+        return serialize
+
+    return field._serialize
+
+
+class CompiledLoader(object):
+    """
+    Deserializes data like `Schema.load` through a plan built once from the schema's fields.
+    """
+
+    def __init__(self, schema, plan):
+        """
+        Initializes a new instance of `CompiledLoader`.
+
+        :param schema: The schema compiled.
+        :param plan: A list of `(field_name, key, load)`, `load` receives the raw value,
+                     the field name and the whole data and returns the value deserialized.
+        """
+        self.schema = schema
+        self.many = schema.many
+        self.plan = plan
+        self.dict_class = schema.dict_class
+        self.unknown = schema.unknown
+        self.field_names = frozenset(field_name for field_name, _, _ in plan)
+        self.post_load = bool(schema._hooks[POST_LOAD])
+
+    def load(self, data, many=None):
+        """
+        Deserializes the given data.
+
+        :param data: The data to be deserialized.
+        :param bool many: Whether the data is a collection, the schema's `many` is used if it is `None`.
+        :return: The deserialized data.
+        """
+        many = self.many if many is None else bool(many)
+
+        try:
+            if many:
+                if not is_collection(data):
+                    raise _Invalid()
+                load_one = self.load_one
+                result = [load_one(item) for item in data]
+            else:
+                result = self.load_one(data)
+
+            if self.post_load:
+                result = self.schema._invoke_load_processors(POST_LOAD, result, many=many, original_data=data,
+                                                             partial=None)
+        except (ValidationError, _Invalid):
+            return self.schema.load(data, many=many)
+
+        return result
+
+    def load_one(self, data):
+        if not isinstance(data, Mapping):
+            raise _Invalid()
+
+        ret = self.dict_class()
+
+        for field_name, key, load in self.plan:
+            value = load(data.get(field_name, missing), field_name, data)
+
+            if value is not missing:
+                if '.' in key:
+                    set_value(ret, key, value)
+                else:
+                    ret[key] = value
+
+        if self.unknown != EXCLUDE:
+            unknown_names = data.keys() - self.field_names
+
+            if unknown_names:
+                if self.unknown == RAISE:
+                    raise _Invalid()
+
+                if self.unknown == INCLUDE:
+                    for field_name in unknown_names:
+                        ret[field_name] = data[field_name]
+
+        return ret
+
+
+def compile_loader(schema):
+    """
+    Compiles the deserialization of the given schema.
+
+    Schemas with `pre_load`, `validates` or `validates_schema` hooks, partial loading
+    or which override how the data is loaded are not compiled.
+    Simple `post_load` hooks are supported.
+
+    :param schema: The schema instance.
+    :return: A `CompiledLoader` or the schema itself if it cannot be compiled.
+    """
+    schema_class = type(schema)
+
+    if schema._hooks[PRE_LOAD] or schema._hooks[VALIDATES] or schema._hooks[VALIDATES_SCHEMA] or \
+            schema.partial or \
+            schema_class.load is not Schema.load or \
+            schema_class._do_load is not Schema._do_load or \
+            schema_class._deserialize is not Schema._deserialize:
+        return schema
+
+    plan = []
+
+    for attr_name, field in schema.load_fields.items():
+        field_name = field.data_key if field.data_key is not None else attr_name
+        key = field.attribute or attr_name
+        plan.append((field_name, key, _compile_field_loader(field)))
+
+    return CompiledLoader(schema, plan)
+
+
+class _Invalid(Exception):
+    """
+    Raised by the compiled loaders when the data must be loaded by the schema.
+    """
+
+
+def _compile_field_loader(field):
+    """
+    Gets a function which does the same as `field.deserialize` for valid values.
+    """
+    field_class = type(field)
+    deserialize = field.deserialize
+
+    if field_class.deserialize is not Field.deserialize or field_class._validate_missing is not Field._validate_missing:
+        return deserialize
+
+    if field_class in (fields.String, ma_fields.String):
+        return _compile_string_loader(field)
+
+    if field_class is ma_fields.Integer:
+        validate = _compile_validators(field.validators)
+
+        def load(value, attr, data):
+            if type(value) is not int:
+                return deserialize(value, attr, data)
+            validate(value)
+            return value
+        return load
+
+    if field_class in (fields.UUID, ma_fields.UUID):
+        validate = _compile_validators(field.validators)
+        as_text = getattr(field, 'as_text', False)
+
+        def load(value, attr, data):
+            if type(value) is not str:
+                return deserialize(value, attr, data)
+            try:
+                output = uuid.UUID(value)
+            except ValueError:
+                raise _Invalid()
+            if as_text:
+                output = value
+            validate(output)
+            return output
+        return load
+
+    if field_class is fields.Enum:
+        validate = _compile_validators(field.validators)
+        enum_type = field.enum_type
+
+        try:
+            members = dict((member.value, member) for member in enum_type)
+        except TypeError:
+            # values which are not hashable.
+            return deserialize
+
+        member_type = type(next(iter(members)))
+
+        def load(value, attr, data):
+            if type(value) is not member_type:
+                return deserialize(value, attr, data)
+            output = members.get(value)
+            if output is None:
+                raise _Invalid()
+            validate(output)
+            return output
+        return load
+
+    if field_class is fields.DelimitedList:
+        validate = _compile_validators(field.validators)
+        inner_load = _compile_field_loader(field.inner)
+        delimiter = field.delimiter
+
+        def load(value, attr, data):
+            if type(value) is not str:
+                return deserialize(value, attr, data)
+            output = [inner_load(each, None, None) for each in value.split(delimiter)]
+            validate(output)
+            return output
+        return load
+
+    return deserialize
+
+
+def _compile_string_loader(field):
+    deserialize = field.deserialize
+    validate = _compile_validators(field.validators)
+
+    allow_empty = getattr(field, 'allow_empty', True)
+    none_if_empty = getattr(field, 'none_if_empty', False)
+    strip = getattr(field, 'strip', False)
+    only_numeric = getattr(field, 'only_numeric', False)
+    upper = getattr(field, 'upper', False)
+
+    def load(value, attr, data):
+        if type(value) is not str:
+            return deserialize(value, attr, data)
+
+        output = value.strip() if strip else value
+
+        if output == '':
+            if none_if_empty or not allow_empty:
+                return deserialize(value, attr, data)
+        elif only_numeric and not output.isnumeric():
+            raise _Invalid()
+
+        if upper:
+            output = output.upper()
+
+        validate(output)
+        return output
+    return load
+
+
+def _compile_validators(validators):
+    """
+    Gets a function which runs the given validators, `Length` is checked inline.
+    """
+    checks = []
+
+    for validator in validators:
+        if type(validator) is Length:
+            checks.append(_compile_length(validator))
+        else:
+            checks.append(validator)
+
+    if not checks:
+        return lambda value: None
+
+    def validate(value):
+        for check in checks:
+            if check(value) is False:
+                raise _Invalid()
+    return validate
+
+
+def _compile_length(validator):
+    min_length, max_length, equal = validator.min, validator.max, validator.equal
+
+    if equal is not None:
+        return lambda value: len(value) == equal
+
+    def check(value):
+        length = len(value)
+        return (min_length is None or length >= min_length) and (max_length is None or length <= max_length)
+    return check
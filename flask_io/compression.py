@@ -0,0 +1,169 @@
+"""
+Compression of the rendered responses, negotiated by the request's Accept-Encoding header.
+"""
+
+import zlib
+
+from abc import ABCMeta, abstractmethod
+from threading import local
+
+
+class Codec(metaclass=ABCMeta):
+    """
+    Base class for all compression codecs.
+    """
+
+    name = None
+    default_level = None
+
+    def __init__(self, level=None):
+        """
+        Initializes a new instance of the codec.
+        :param int level: The compression level, the codec's default level is used if it is `None`.
+        """
+        self.level = self.default_level if level is None else level
+
+    @abstractmethod
+    def compress(self, data):
+        """
+        Compresses the given data.
+        :param bytes data: The data to be compressed.
+        :return: The data compressed.
+        """
+        pass
+
+    @abstractmethod
+    def compressor(self):
+        """
+        Creates an object used to compress a stream of data.
+        :return: An object with the methods `compress(data)` and `flush()`.
+        """
+        pass
+
+    def compress_stream(self, chunks):
+        """
+        Compresses the given chunks of data incrementally.
+        :param chunks: An iterable of byte arrays.
+        :return: A generator of byte arrays.
+        """
+        compressor = self.compressor()
+
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+        yield compressor.flush()
+
+
+class GzipCodec(Codec):
+    """
+    Compresses with gzip.
+    """
+
+    name = 'gzip'
+    default_level = 6
+
+    def compress(self, data):
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+    def compressor(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+
+class BrotliCodec(Codec):
+    """
+    Compresses with brotli, it requires the package `brotli`.
+    """
+
+    name = 'br'
+    default_level = 4
+
+    def __init__(self, level=None):
+        import brotli
+        self.brotli = brotli
+        super().__init__(level)
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.level)
+
+    def compressor(self):
+        return _BrotliCompressor(self.brotli.Compressor(quality=self.level))
+
+
+class ZstdCodec(Codec):
+    """
+    Compresses with zstd, it requires the package `zstandard`.
+    """
+
+    name = 'zstd'
+    default_level = 3
+
+    def __init__(self, level=None):
+        import zstandard
+        super().__init__(level)
+        self.zstandard = zstandard
+        self.__local = local()
+
+    def compress(self, data):
+        # a compressor is not thread-safe, so every thread has its own one.
+        zstd_compressor = getattr(self.__local, 'compressor', None)
+        if zstd_compressor is None:
+            zstd_compressor = self.__local.compressor = self.zstandard.ZstdCompressor(level=self.level)
+        return zstd_compressor.compress(data)
+
+    def compressor(self):
+        # a stream keeps the compressor busy until it ends, so it gets its own one.
+        return self.zstandard.ZstdCompressor(level=self.level).compressobj()
+
+
+class _BrotliCompressor(object):
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def get_available_codecs(levels=None):
+    """
+    Gets the codecs whose libraries are installed, from the most to the least preferred.
+
+    :param dict levels: The compression level by codec name.
+    :return: A list of codecs.
+    """
+    levels = levels or {}
+    codecs = []
+
+    for codec_class in (BrotliCodec, ZstdCodec, GzipCodec):
+        try:
+            codecs.append(codec_class(levels.get(codec_class.name)))
+        except ImportError:
+            pass
+
+    return codecs
+
+
+def select_codec(accept_encodings, codecs):
+    """
+    Selects the codec with the highest quality in the Accept-Encoding header,
+    the order of the codecs is used as tie breaker.
+
+    :param accept_encodings: The request's Accept-Encoding header parsed.
+    :param codecs: The list of codecs supported.
+    :return: The codec selected or none.
+    """
+    selected = None
+    selected_quality = 0
+
+    for codec in codecs:
+        quality = accept_encodings.quality(codec.name)
+        if quality > selected_quality:
+            selected = codec
+            selected_quality = quality
+
+    return selected
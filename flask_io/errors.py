@@ -68,3 +68,8 @@ class UnsupportedMediaType(APIError):
             self.error = Error(self.error.message)
 
         self.error.media_type = media_type
+
+
+class PayloadTooLarge(APIError):
+    status_code = 413
+    error = Error('Request payload is too large.')
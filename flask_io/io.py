@@ -1,19 +1,28 @@
 import functools
 import traceback
 
-from flask import request
-from inspect import isclass
+from collections.abc import Iterator, Sequence
+from flask import request, stream_with_context
+from inspect import isclass, iscoroutinefunction
 from logging import getLogger
 from werkzeug.exceptions import HTTPException
 from . import fields, missing, ValidationError
-from .actions import Action
-from .errors import APIError, BadRequest, NotAcceptable, UnsupportedMediaType
+from .actions import Action, Input, Output
+from .backends import get_json_backend
+from .batching import BatchEndpoint, BatchItemSchema
+from .caching import MemoryCache, ResponseCache
+from .compiler import compile_dumper, compile_loader
+from .compression import get_available_codecs, select_codec
+from .errors import APIError, BadRequest, NotAcceptable, PayloadTooLarge, UnsupportedMediaType
+from .metrics import FileStore, MetricsRegistry
 from .negotiation import DefaultContentNegotiation
-from .parsers import JSONParser
+from .parsers import JSONParser, NDJSONParser, Parser
+from .profiling import CollapsedStackSink, Profiler
 from .renderers import JSONRenderer
-from .tracing import Tracer
-from .utils import errors_to_dict, get_fields_from_request, http_status_message, marshal, reraise, unpack, \
-    validation_error_to_errors, Stopwatch
+from .tracing import BackgroundEmitter, Tracer, emitters
+from .utils import compute_etag, errors_to_dict, format_server_timing, get_fields_from_request, get_timings, \
+    http_status_message, marshal, marshal_stream, reraise, unmarshal_stream, unpack, validation_error_to_errors, \
+    LRUCache, SizeLimitedStream, Stopwatch, Stream, Timings
 
 
 class FlaskIO(object):
@@ -21,25 +30,55 @@ class FlaskIO(object):
     The class responsible for parsing request into function parameters and deserialize function returns into response.
     """
 
-    def __init__(self, app=None):
+    def __init__(self, app=None, json_backend=None):
         """
         Initializes a new instance.
 
         :param app: A Flask instance class.
+        :param json_backend: The JSON backend instance or name (`stdlib`, `orjson`, `ujson`, `simplejson` or `auto`).
         """
 
         self.__app = None
 
+        self.json_backend = get_json_backend(json_backend)
+
         self.content_negotiation = DefaultContentNegotiation()
         self.default_authenticators = []
         self.default_permissions = []
-        self.default_parsers = [JSONParser()]
-        self.default_renderers = [JSONRenderer()]
+        self.default_parsers = [JSONParser(self.json_backend), NDJSONParser(self.json_backend)]
+        self.default_renderers = [JSONRenderer(self.json_backend)]
 
         self.logger = getLogger('flask-io')
 
         self.tracer = Tracer(self)
 
+        # counters and latency histograms of every endpoint
+        self.metrics = MetricsRegistry()
+
+        # samples the stacks of slow requests
+        self.profiler = Profiler(self)
+
+        self.actions = {}
+
+        # schemas instantiated for the fields requested through the parameter 'fields'
+        self.schema_cache = LRUCache(128)
+
+        # rendered responses of the endpoints decorated by `cache`
+        self.cache_backend = MemoryCache()
+
+        # generates a weak ETag for every GET response
+        self.etag_enabled = False
+
+        # the maximum number of bytes of a request body, `None` for no limit
+        self.max_body_size = None
+
+        # adds the time spent on each phase of the request to the header Server-Timing
+        self.server_timing_enabled = False
+
+        # codecs used to compress the responses, from the most to the least preferred
+        self.compression_codecs = []
+        self.compression_threshold = 1024
+
         if app:
             self.init_app(app)
 
@@ -54,6 +93,58 @@ class FlaskIO(object):
         self.__app.before_first_request(self.__setup)
 
         self.tracer.enabled = self.__app.config.get('TRACE_ENABLED', self.tracer.enabled)
+        self.tracer.sample_rate = self.__app.config.get('TRACE_SAMPLE_RATE', self.tracer.sample_rate)
+        self.tracer.trace_errors = self.__app.config.get('TRACE_ERRORS', self.tracer.trace_errors)
+        self.tracer.slow_threshold = self.__app.config.get('TRACE_SLOW_THRESHOLD', self.tracer.slow_threshold)
+        self.tracer.max_body_size = self.__app.config.get('TRACE_MAX_BODY_SIZE', self.tracer.max_body_size)
+
+        if self.__app.config.get('TRACE_RATE_LIMIT'):
+            self.tracer.set_rate_limit(self.__app.config['TRACE_RATE_LIMIT'])
+
+        if self.__app.config.get('TRACE_EMITTER'):
+            self.trace_emit(self.__app.config['TRACE_EMITTER'])
+
+        if self.__app.config.get('TRACE_BACKGROUND') and not self.tracer.background:
+            self.tracer.background = BackgroundEmitter(self.tracer)
+
+        json_backend = self.__app.config.get('JSON_BACKEND')
+        if json_backend:
+            self.json_backend = get_json_backend(json_backend)
+
+            for parser_or_renderer in self.default_parsers + self.default_renderers:
+                if isinstance(parser_or_renderer, (JSONParser, JSONRenderer)):
+                    parser_or_renderer.backend = self.json_backend
+
+        ndjson_max_line_size = self.__app.config.get('NDJSON_MAX_LINE_SIZE')
+        if ndjson_max_line_size:
+            for parser in self.default_parsers:
+                if isinstance(parser, NDJSONParser):
+                    parser.max_line_size = ndjson_max_line_size
+
+        self.schema_cache.max_size = self.__app.config.get('SCHEMA_CACHE_SIZE', self.schema_cache.max_size)
+        self.etag_enabled = self.__app.config.get('ETAG_ENABLED', self.etag_enabled)
+        self.server_timing_enabled = self.__app.config.get('SERVER_TIMING_ENABLED', self.server_timing_enabled)
+        self.max_body_size = self.__app.config.get('MAX_BODY_SIZE', self.max_body_size)
+
+        if self.__app.config.get('COMPRESSION_ENABLED'):
+            self.compression_codecs = get_available_codecs(self.__app.config.get('COMPRESSION_LEVELS'))
+
+        self.compression_threshold = self.__app.config.get('COMPRESSION_THRESHOLD', self.compression_threshold)
+
+        self.metrics.enabled = self.__app.config.get('METRICS_ENABLED', self.metrics.enabled)
+
+        if self.__app.config.get('METRICS_DIRECTORY'):
+            self.metrics.store = FileStore(self.__app.config['METRICS_DIRECTORY'])
+
+        self.profiler.enabled = self.__app.config.get('PROFILE_ENABLED', self.profiler.enabled)
+        self.profiler.interval = self.__app.config.get('PROFILE_INTERVAL', self.profiler.interval)
+        self.profiler.slow_threshold = self.__app.config.get('PROFILE_SLOW_THRESHOLD', self.profiler.slow_threshold)
+        self.profiler.sample_rate = self.__app.config.get('PROFILE_SAMPLE_RATE', self.profiler.sample_rate)
+        self.profiler.max_overhead = self.__app.config.get('PROFILE_MAX_OVERHEAD', self.profiler.max_overhead)
+
+        if self.__app.config.get('PROFILE_DIRECTORY'):
+            self.profiler.sink = CollapsedStackSink(self.__app.config['PROFILE_DIRECTORY'],
+                                                    self.__app.config.get('PROFILE_MAX_FILES', 100))
 
     def bad_request(self, error):
         """
@@ -163,6 +254,51 @@ class FlaskIO(object):
             return func
         return decorator
 
+    def cache(self, ttl=None, vary_on=(), tags=(), backend=None):
+        """
+        A decorator that caches the rendered response of a function.
+
+        The cached response is returned right after the authentication and authorization,
+        the arguments are not parsed and the function is not called.
+
+        :param float ttl: The number of seconds a response lives.
+        :param vary_on: The values which the response depends on, `query`, `user:<attribute>`, `header:<name>`
+                        or a function.
+        :param tags: The tags used to invalidate the responses, they are formatted with the URL arguments.
+        :param CacheBackend backend: The cache backend, `cache_backend` is used by default.
+        :return: A function
+        """
+
+        response_cache = ResponseCache(backend or self.cache_backend, ttl, vary_on, tags)
+
+        def decorator(func):
+            func.response_cache = response_cache
+            return func
+        return decorator
+
+    def etag(self, getter):
+        """
+        A decorator that sets a function which returns the ETag of the response up front,
+        if the client has the current version the response 304 is returned without calling the function.
+
+        :param getter: A function that receives the same arguments of the decorated function and returns
+                       the ETag, e.g. a version number, or `None` if it is unknown.
+        :return: A function
+        """
+
+        def decorator(func):
+            func.etag = getter
+            return func
+        return decorator
+
+    def invalidate_cache(self, *tags):
+        """
+        Removes the responses cached with any of the given tags from the default cache backend.
+
+        :param tags: The tags.
+        """
+        self.cache_backend.invalidate(*tags)
+
     def permissions(self, perms):
         """
         A decorator that sets a list of permissions for a function.
@@ -187,24 +323,44 @@ class FlaskIO(object):
             return func
         return decorator
 
-    def from_body(self, param_name, schema):
+    def from_body(self, param_name, schema, max_size=None):
         """
         A decorator that converts the request body into a function parameter based on the specified schema.
 
         :param param_name: The parameter which receives the argument.
         :param schema: The schema class or instance used to deserialize the request body toa Python object.
+        :param int max_size: The maximum number of bytes of the body, `max_body_size` is used if it is `None`.
         :return: A function
         """
 
         schema = schema() if isclass(schema) else schema
+        loader = compile_loader(schema)
 
-        def decorator(func):
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                kwargs[param_name] = self.__parse_body(schema)
-                return func(*args, **kwargs)
-            return wrapper
-        return decorator
+        return self.__input(param_name, 'body', lambda data: self.__parse_body(loader, max_size),
+                            source=schema)
+
+    def from_body_many(self, param_name, schema, chunk_size=1000, max_size=None):
+        """
+        A decorator that converts the request body, a JSON array or newline delimited JSON,
+        into an iterator of Python objects based on the specified schema.
+
+        The items are deserialized in chunks as the iterator is consumed, so the function
+        can process the first items before the last ones are validated, a `ValidationError`
+        raised while iterating carries the index of every invalid item.
+        A newline delimited JSON body is read from the request stream line by line, it is never buffered.
+
+        :param param_name: The parameter which receives the iterator.
+        :param schema: The schema class or instance used to deserialize every item.
+        :param int chunk_size: The number of items deserialized at once.
+        :param int max_size: The maximum number of bytes of the body, `max_body_size` is used if it is `None`.
+        :return: A function
+        """
+
+        schema = schema() if isclass(schema) else schema
+        loader = compile_loader(schema)
+
+        return self.__input(param_name, 'body', lambda data: self.__parse_body_many(loader, chunk_size, max_size),
+                            source=schema)
 
     def from_cookie(self, param_name, field):
         """
@@ -248,42 +404,106 @@ class FlaskIO(object):
 
         return self.__from_source(param_name, field, lambda: request.args, 'query')
 
-    def marshal_with(self, schema, envelope=None):
+    def marshal_with(self, schema, envelope=None, stream=False, chunk_size=1000):
         """
         A decorator that apply marshalling to the return values of your methods.
 
         :param schema: The schema class to be used to serialize the values.
         :param envelope: The key used to envelope the data.
+        :param bool stream: Indicates whether iterables and generators should be serialized in chunks
+                            and sent as a chunked response.
+        :param int chunk_size: The number of items serialized at once when streaming.
         :return: A function.
         """
 
-        # schema is pre instantiated to avoid instantiate it
-        # on every request
+        # schema is pre instantiated and compiled to avoid
+        # doing it on every request, it is compiled on the first dump
+        # because the nested schemas given by name may not be defined yet.
         schema_is_class = isclass(schema)
-        schema_cache = schema() if schema_is_class else schema
+        schema_default = schema() if schema_is_class else schema
+        schema_cache = None
+
+        def dump(data):
+            nonlocal schema_cache
+
+            if isinstance(data, self.__app.response_class):
+                return data
+
+            if schema_cache is None:
+                schema_cache = compile_dumper(schema_default)
+
+            schema_instance = schema_cache
+
+            # if there is the parameter 'fields' in the url
+            # we cannot use the pre instantiated schema,
+            # a schema is instantiated for each set of fields
+            # and kept in the cache.
+            if schema_is_class:
+                only = get_fields_from_request(schema=schema)
+                if only:
+                    schema_instance = self.__get_schema(schema, only, schema_cache)
+
+            if stream:
+                return marshal_stream(data, schema_instance, envelope, chunk_size)
+
+            return marshal(data, schema_instance, envelope)
 
         def decorator(func):
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                data = func(*args, **kwargs)
-                if isinstance(data, self.__app.response_class):
-                    return data
-
-                schema_instance = schema_cache
-
-                # if there is the parameter 'fields' in the url
-                # we cannot use the cached schema instance
-                # in this case we have to instantiate the schema
-                # on every request.
-                if schema_is_class:
-                    only = get_fields_from_request(schema=schema)
-                    if only:
-                        schema_instance = schema(only=only)
-
-                return marshal(data, schema_instance, envelope)
-            return wrapper
+            # every function gets its own step, the step is bound to the wrapper.
+            step = Output(dump, schema, envelope=envelope, stream=stream)
+
+            if iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    return dump(await func(*args, **kwargs))
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    return dump(func(*args, **kwargs))
+            return step.bind(wrapper)
         return decorator
 
+    def add_batch_endpoint(self, rule='/batch', endpoint='batch', **options):
+        """
+        Adds an endpoint which performs several requests in a single HTTP call.
+
+        The endpoint receives a JSON array of `{"method": ..., "path": ..., "query": ..., "headers": ..., "body": ...}`
+        and returns a JSON array of `{"status": ..., "body": ...}`.
+
+        :param str rule: The URL rule of the endpoint.
+        :param str endpoint: The name of the endpoint.
+        :param options: The options of the batch, see `BatchEndpoint`.
+        :return BatchEndpoint: The batch endpoint.
+        """
+        batch = BatchEndpoint(self.__app, endpoint, **options)
+
+        view = self.from_body('items', BatchItemSchema(many=True))(batch)
+        self.__app.add_url_rule(rule, endpoint, view, methods=['POST'])
+
+        return batch
+
+    def add_metrics_endpoint(self, rule='/metrics', endpoint='metrics'):
+        """
+        Adds an endpoint which exposes the metrics in the Prometheus text format.
+
+        :param str rule: The URL rule of the endpoint.
+        :param str endpoint: The name of the endpoint.
+        """
+        def view():
+            return self.__app.response_class(self.metrics.render(),
+                                             mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+        self.__app.add_url_rule(rule, endpoint, view, methods=['GET'])
+
+    def describe(self):
+        """
+        Describes what is performed on every request by each endpoint,
+        it is available once the application has handled its first request.
+
+        :return dict: The description of each endpoint.
+        """
+        return {endpoint: action.describe() for endpoint, action in self.actions.items()}
+
     def trace_inspect(self):
         """
         A decorator that allows to inspect/change the trace data.
@@ -293,11 +513,24 @@ class FlaskIO(object):
             return f
         return decorator
 
-    def trace_emit(self):
+    def trace_emit(self, emitter=None, **options):
         """
         A decorator that allows to change the trace emitter.
         By default Python logging is used to emit the trace data.
+
+        A built-in emitter can be chosen by its name, `json` or `logfmt`, or an emitter instance
+        can be given, in that case the emitter is returned rather than a decorator.
+
+        :param emitter: The name of a built-in emitter or an emitter instance.
+        :param options: The options of the built-in emitter, see `StructuredEmitter`.
         """
+        if emitter is not None:
+            if isinstance(emitter, str):
+                options.setdefault('logger', self.logger)
+                emitter = emitters[emitter](**options)
+            self.tracer.emitter = emitter
+            return emitter
+
         def decorator(f):
             self.tracer.emitter = f
             return f
@@ -357,9 +590,29 @@ class FlaskIO(object):
                 renderer = default_renderer
                 mimetype = default_renderer.mimetype
 
-            data_bytes = renderer.render(data, mimetype)
+            # a stream is only measured while the generator is created, it is rendered as it is sent.
+            with get_timings().phase('render'):
+                if isinstance(data, Stream):
+                    data_bytes = renderer.render_stream(data, mimetype)
+                else:
+                    data_bytes = renderer.render(data, mimetype)
+
+            content_encoding = None
+
+            if self.compression_codecs:
+                data_bytes, content_encoding = self.__compress(data_bytes)
+
+            if not isinstance(data_bytes, bytes):
+                data_bytes = stream_with_context(data_bytes)
+
             data = self.__app.response_class(data_bytes, mimetype=str(mimetype))
 
+            if self.compression_codecs:
+                data.vary.add('Accept-Encoding')
+
+            if content_encoding:
+                data.content_encoding = content_encoding
+
         if status is not None:
             data.status_code = status
 
@@ -368,25 +621,125 @@ class FlaskIO(object):
 
         return data
 
-    def __from_source(self, param_name, field, getter_data, location):
-        field = field() if isclass(field) else field
-        if not field.required:
-            field.allow_none = True
+    def __get_schema(self, schema, only, default):
+        key = (schema, only)
+
+        schema_instance = self.schema_cache.get(key)
+        if schema_instance is None:
+            # the invalid fields are ignored, the default schema is used if none is valid,
+            # so an invalid nested field behaves like an unknown one.
+            root = schema()
+            only = [field_name for field_name in only
+                    if '.' not in field_name or self.__is_valid_field(root, field_name)]
+
+            schema_instance = compile_dumper(schema(only=only)) if only else default
+            self.schema_cache.set(key, schema_instance)
+
+        return schema_instance
+
+    def __is_valid_field(self, schema_instance, field_name):
+        path = field_name.split('.')
+
+        # every field of a dotted path but the last one must be nested.
+        for field_name in path[:-1]:
+            field = schema_instance.fields.get(field_name)
+
+            if isinstance(field, fields.List):
+                field = field.inner
+
+            if not isinstance(field, fields.Nested):
+                return False
+
+            # nested schemas are only instantiated when they are used.
+            schema_instance = field.schema
+
+        return path[-1] in schema_instance.fields
+
+    def __compress(self, data):
+        """
+        Compresses the rendered data with the codec negotiated by the request's Accept-Encoding header,
+        the data below the threshold is not compressed but a stream is always compressed.
+
+        :param data: The byte array or a generator of byte arrays.
+        :return: A tuple with the data and the content encoding.
+        """
+
+        is_stream = not isinstance(data, bytes)
+
+        if not is_stream and len(data) < self.compression_threshold:
+            return data, None
+
+        codec = select_codec(request.accept_encodings, self.compression_codecs)
+
+        if codec is None:
+            return data, None
 
+        if is_stream:
+            return codec.compress_stream(data), codec.name
+
+        return codec.compress(data), codec.name
+
+    def __make_conditional(self, response):
+        """
+        Adds a weak ETag to the response if it is enabled and
+        replaces the response by 304 if the client has the same version.
+
+        :param response: The Flask response.
+        :return: A Flask response.
+        """
+
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.is_streamed:
+            return response
+
+        if self.etag_enabled and 'ETag' not in response.headers:
+            response.set_etag(compute_etag(response.get_data()), weak=True)
+
+        etag, _ = response.get_etag()
+
+        if etag is None or not request.if_none_match.contains_weak(etag):
+            return response
+
+        not_modified = self.__app.response_class(status=304)
+
+        for key in ('ETag', 'Cache-Control', 'Expires', 'Vary'):
+            if key in response.headers:
+                not_modified.headers[key] = response.headers[key]
+
+        return not_modified
+
+    def __input(self, param_name, location, parse, getter_data=None, source=None):
         def decorator(func):
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                kwargs[param_name] = self.__parse_field(param_name, field, getter_data(), location)
-                return func(*args, **kwargs)
-            return wrapper
+            # every function gets its own step, the step is bound to the wrapper.
+            step = Input(param_name, location, parse, getter_data, source)
+
+            if iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    kwargs[step.param_name] = step()
+                    return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    kwargs[step.param_name] = step()
+                    return func(*args, **kwargs)
+            return step.bind(wrapper)
         return decorator
 
-    def __parse_field(self, field_name, field, data, location):
+    def __from_source(self, param_name, field, getter_data, location):
+        field = field() if isclass(field) else field
         field.allow_none = True
 
-        field_name = field.data_key or field_name
+        # the lookup is resolved once rather than on every request.
+        field_name = field.data_key or param_name
+        is_list = isinstance(field, fields.List)
+
+        def parse(data):
+            return self.__parse_field(field_name, field, is_list, data, location)
 
-        if isinstance(field, fields.List):
+        return self.__input(param_name, location, parse, getter_data, field)
+
+    def __parse_field(self, field_name, field, is_list, data, location):
+        if is_list:
             raw_value = data.getlist(field_name) or missing
         else:
             raw_value = data.get(field_name) or missing
@@ -410,63 +763,170 @@ class FlaskIO(object):
             e.kwargs['location'] = location
             raise
 
-    def __parse_body(self, schema):
-        if not request.get_data():
-            raise BadRequest('Payload missing.')
+    def __parse_body(self, schema, max_size):
+        decoded_data = self.__decode_body(max_size)
+
+        try:
+            with get_timings().phase('parse.schema_load'):
+                model = schema.load(decoded_data)
+
+        except ValidationError as e:
+            e.kwargs['location'] = 'body'
+            raise
+
+        return model
+
+    def __parse_body_many(self, schema, chunk_size, max_size):
+        parser, mimetype = self.__select_parser()
+
+        # parsers which read the stream incrementally, e.g. NDJSON, never get
+        # the whole body buffered, the view pulls the lines as it iterates.
+        if type(parser).parse_stream is not Parser.parse_stream:
+            max_size = self.__check_body_size(max_size)
+            stream = request.stream if max_size is None else SizeLimitedStream(request.stream, max_size)
+            items = parser.parse_stream(stream, mimetype)
+        else:
+            items = self.__decode_body(max_size)
+
+        if not isinstance(items, (Sequence, Iterator)) or isinstance(items, (str, bytes)):
+            # the schema reports that the body is not a collection.
+            try:
+                schema.load(items, many=True)
+            except ValidationError as e:
+                e.kwargs['location'] = 'body'
+                raise
+
+        return unmarshal_stream(self.__iter_body(items), schema, chunk_size)
 
+    def __iter_body(self, items):
+        # the lines of a NDJSON body are read and parsed while they are iterated.
+        try:
+            yield from items
+        except ValueError:
+            raise BadRequest('Malformed request.')
+
+    def __select_parser(self):
         parser, mimetype = self.content_negotiation.select_parser(request, self.default_parsers)
 
         if not parser:
             raise UnsupportedMediaType(request.headers['content-type'])
 
+        return parser, mimetype
+
+    def __decode_body(self, max_size):
+        timings = get_timings()
+
+        with timings.phase('parse.body_read'):
+            data = self.__read_body(max_size)
+
+        if not data:
+            raise BadRequest('Payload missing.')
+
+        parser, mimetype = self.__select_parser()
+
         try:
-            decoded_data = parser.parse(request.get_data(), mimetype)
+            # the parsers which opt in read the body cached by the request without copying it.
+            with timings.phase('parse.parser'):
+                return parser.parse(memoryview(data) if parser.zero_copy else data, mimetype)
         except:
             raise BadRequest('Malformed request.')
 
-        try:
-            model = schema.load(decoded_data)
+    def __check_body_size(self, max_size):
+        """
+        Rejects the request if its Content-Length is larger than the maximum size, before the body is read.
 
-        except ValidationError as e:
-            e.kwargs['location'] = 'body'
-            raise
+        :param int max_size: The maximum size of the endpoint or `None` to use `max_body_size`.
+        :return: The maximum size to be enforced while the body is read.
+        """
+        if max_size is None:
+            max_size = self.max_body_size
 
-        return model
+        if max_size is not None and request.content_length is not None and request.content_length > max_size:
+            raise PayloadTooLarge('Request payload cannot be larger than %d bytes.' % max_size)
+
+        return max_size
+
+    def __read_body(self, max_size):
+        """
+        Reads the request body once, a body without Content-Length, e.g. chunked,
+        is rejected as soon as more bytes than the maximum size are read.
+
+        :param int max_size: The maximum size of the endpoint or `None` to use `max_body_size`.
+        :return: The body.
+        """
+        max_size = self.__check_body_size(max_size)
+
+        if max_size is not None and request.content_length is None:
+            # werkzeug reads the body through `request.stream`, which can be wrapped,
+            # so the body is limited and still cached by the request.
+            request.stream = SizeLimitedStream(request.stream, max_size)
+
+        return request.get_data()
 
     def __process_action(self, action):
         def decorator(**kwargs):
-            latency = response = error = None
+            latency = timings = profile_session = response = error = None
+
+            trace_enabled = action.trace_enabled and self.tracer.enabled
+            metrics_enabled = self.metrics.enabled
 
-            if action.trace_enabled and self.tracer.enabled:
+            if trace_enabled or metrics_enabled or self.server_timing_enabled or self.profiler.enabled:
                 latency = Stopwatch.start_new()
+                timings = request.environ['flask_io.timings'] = Timings()
+
+            if self.profiler.enabled:
+                profile_session = self.profiler.start(latency)
 
             try:
                 response = action(**kwargs)
                 response = self.__make_response(response)
+
+                if action.response_cache is not None:
+                    action.response_cache.set(response)
+
+                response = self.__make_conditional(response)
                 return response
             except Exception as e:
                 error = e
                 response = self.__handle_error(e)
                 return response
             finally:
-                if action.trace_enabled and self.tracer.enabled:
+                if latency is not None:
                     latency.stop()
-                    self.tracer.trace(request, response, error, latency)
+
+                if profile_session is not None:
+                    self.profiler.stop(profile_session, request.endpoint)
+
+                if self.server_timing_enabled and response is not None:
+                    response.headers['Server-Timing'] = format_server_timing(timings.as_dict(), latency.elapsed)
+
+                if trace_enabled and self.tracer.sample(action.trace_sample_rate, response, error, latency):
+                    self.tracer.trace(request, response, error, latency, timings.as_dict())
+
+                if metrics_enabled:
+                    if response is None:
+                        self.metrics.observe(request.endpoint, 500, None, latency.elapsed, timings.as_dict())
+                    else:
+                        self.metrics.observe(request.endpoint, response.status_code, response.mimetype,
+                                             latency.elapsed, timings.as_dict())
 
         return decorator
 
     def __setup(self):
         for endpoint in self.__app.view_functions.keys():
+            trace_sample_rate = False
             for rule in self.__app.url_map.iter_rules(endpoint):
-                if self.tracer.match(rule):
-                    trace_enabled = True
+                trace_sample_rate = self.tracer.get_sample_rate(rule)
+                if trace_sample_rate is not False:
                     break
-            else:
-                trace_enabled = False
+
+            trace_enabled = trace_sample_rate is not False
 
             action = Action(self.__app.view_functions[endpoint],
                             self.default_authenticators,
                             self.default_permissions,
-                            trace_enabled)
+                            trace_enabled,
+                            trace_sample_rate if trace_enabled else None)
 
+            self.actions[endpoint] = action
             self.__app.view_functions[endpoint] = self.__process_action(action)
@@ -0,0 +1,359 @@
+"""
+In-process metrics of the endpoints exposed in the Prometheus text format.
+"""
+
+import json
+import os
+import tempfile
+
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_left
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ('parse', 'auth', 'view', 'marshal', 'render')
+
+
+class MetricsRegistry(object):
+    """
+    Keeps the number of requests of every endpoint by status code and mimetype,
+    and histograms of the latency of the requests and of their phases.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, phases=PHASES, store=None):
+        """
+        Initializes a new instance of `MetricsRegistry`.
+
+        :param buckets: The upper bounds in seconds of the histogram buckets.
+        :param phases: The phases of the requests measured.
+        :param MetricsStore store: The store which aggregates the metrics of several processes,
+                                   `None` to only expose the metrics of this process.
+        """
+        self.enabled = False
+        self.buckets = tuple(sorted(buckets))
+        self.phases = tuple(phases)
+        self.store = store
+        self.endpoints = {}
+        self.__lock = Lock()
+
+    def observe(self, endpoint, status, mimetype, latency, timings):
+        """
+        Records a request.
+
+        :param str endpoint: The endpoint of the request.
+        :param int status: The status code of the response.
+        :param str mimetype: The mimetype of the response.
+        :param float latency: The number of seconds spent on the request.
+        :param dict timings: The number of seconds spent on each phase of the request.
+        """
+        metrics = self.endpoints.get(endpoint)
+
+        if metrics is None:
+            with self.__lock:
+                metrics = self.endpoints.get(endpoint)
+                if metrics is None:
+                    metrics = self.endpoints[endpoint] = EndpointMetrics(self.buckets, self.phases)
+
+        metrics.observe(status, mimetype, latency, timings)
+
+        if self.store is not None:
+            try:
+                self.store.changed(self)
+            except Exception:
+                # a request never fails because its metrics cannot be stored.
+                getLogger('flask-io').exception('Failed to store the metrics.')
+
+    def collect(self):
+        """
+        Gets a snapshot of the metrics of this process.
+
+        :return dict: The metrics by endpoint.
+        """
+        return {endpoint: metrics.collect() for endpoint, metrics in list(self.endpoints.items())}
+
+    def reset(self):
+        """
+        Removes all the metrics.
+        """
+        with self.__lock:
+            self.endpoints = {}
+
+    def render(self):
+        """
+        Renders the metrics in the Prometheus text format,
+        the metrics of all the processes are aggregated if there is a store.
+
+        :return str: The metrics.
+        """
+        if self.store is not None:
+            snapshot = self.store.aggregate(self)
+        else:
+            snapshot = self.collect()
+
+        return render_prometheus(snapshot, self.buckets)
+
+
+class EndpointMetrics(object):
+    """
+    The metrics of an endpoint, they are updated under a single lock per request.
+    """
+
+    def __init__(self, buckets, phases):
+        self.buckets = buckets
+        self.phases = phases
+        self.requests = {}
+        self.latency = Histogram(buckets)
+        self.phase_latency = {phase: Histogram(buckets) for phase in phases}
+        self.__lock = Lock()
+
+    def observe(self, status, mimetype, latency, timings):
+        key = (status, mimetype)
+
+        with self.__lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(latency)
+
+            for phase, elapsed in timings.items():
+                histogram = self.phase_latency.get(phase)
+                if histogram is not None:
+                    histogram.observe(elapsed)
+
+    def collect(self):
+        with self.__lock:
+            requests = {}
+            for (status, mimetype), count in self.requests.items():
+                requests.setdefault(str(status), {})[mimetype or ''] = count
+
+            return dict(
+                requests=requests,
+                latency=self.latency.collect(),
+                phases={phase: histogram.collect() for phase, histogram in self.phase_latency.items()
+                        if histogram.count}
+            )
+
+
+class Histogram(object):
+    """
+    A histogram of durations with fixed buckets, it is not thread-safe on its own.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def collect(self):
+        return dict(counts=list(self.counts), sum=self.sum, count=self.count)
+
+
+class MetricsStore(metaclass=ABCMeta):
+    """
+    Base class for the stores which aggregate the metrics of several processes.
+    """
+
+    def changed(self, registry):
+        """
+        Called after every request recorded by the registry.
+
+        :param MetricsRegistry registry: The registry.
+        """
+        pass
+
+    @abstractmethod
+    def aggregate(self, registry):
+        """
+        Gets the metrics of all the processes.
+
+        :param MetricsRegistry registry: The registry of this process.
+        :return dict: The metrics by endpoint.
+        """
+        pass
+
+
+class FileStore(MetricsStore):
+    """
+    Aggregates the metrics of several processes through a directory shared by them,
+    e.g. the workers of gunicorn or uWSGI.
+
+    Every process writes a snapshot of its metrics into its own file at most every `flush_interval` seconds
+    and when the metrics are rendered, the snapshots of all the processes are summed up.
+    The files of processes which have exited are kept, so their counters do not go backwards.
+    """
+
+    def __init__(self, directory, flush_interval=1.0):
+        """
+        Initializes a new instance of `FileStore`.
+
+        :param str directory: The directory shared by the processes.
+        :param float flush_interval: The minimum number of seconds between two writes of a process.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.__next_flush = 0.0
+        self.__lock = Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def changed(self, registry):
+        if monotonic() < self.__next_flush:
+            return
+
+        # a single thread flushes, the others go on without waiting for it.
+        if not self.__lock.acquire(blocking=False):
+            return
+
+        try:
+            if monotonic() >= self.__next_flush:
+                self.__flush(registry)
+        finally:
+            self.__lock.release()
+
+    def flush(self, registry):
+        """
+        Writes the metrics of this process.
+
+        :param MetricsRegistry registry: The registry of this process.
+        """
+        with self.__lock:
+            self.__flush(registry)
+
+    def __flush(self, registry):
+        self.__next_flush = monotonic() + self.flush_interval
+
+        path = os.path.join(self.directory, 'metrics-%d.json' % os.getpid())
+
+        # the file is written under a unique name and replaced atomically, so it is never read half written.
+        fd, temp_path = tempfile.mkstemp(prefix='.metrics-', suffix='.tmp', dir=self.directory)
+
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(registry.collect(), f)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def aggregate(self, registry):
+        self.flush(registry)
+
+        snapshot = {}
+
+        for file_name in sorted(os.listdir(self.directory)):
+            if not file_name.startswith('metrics-') or not file_name.endswith('.json'):
+                continue
+
+            try:
+                with open(os.path.join(self.directory, file_name)) as f:
+                    merge_metrics(snapshot, json.load(f))
+            except (OSError, ValueError):
+                # the file has been removed or is not a snapshot.
+                pass
+
+        return snapshot
+
+
+def merge_metrics(target, source):
+    """
+    Adds the metrics of a snapshot into another one.
+
+    :param dict target: The snapshot which receives the metrics.
+    :param dict source: The snapshot to be added.
+    """
+    for endpoint, metrics in source.items():
+        target_metrics = target.setdefault(endpoint, dict(requests={}, latency=None, phases={}))
+
+        for status, mimetypes in metrics['requests'].items():
+            target_mimetypes = target_metrics['requests'].setdefault(status, {})
+            for mimetype, count in mimetypes.items():
+                target_mimetypes[mimetype] = target_mimetypes.get(mimetype, 0) + count
+
+        target_metrics['latency'] = _merge_histogram(target_metrics['latency'], metrics['latency'])
+
+        for phase, histogram in metrics['phases'].items():
+            target_metrics['phases'][phase] = _merge_histogram(target_metrics['phases'].get(phase), histogram)
+
+
+def render_prometheus(snapshot, buckets):
+    """
+    Renders a snapshot of the metrics in the Prometheus text format.
+
+    :param dict snapshot: The metrics by endpoint.
+    :param buckets: The upper bounds of the histogram buckets.
+    :return str: The metrics.
+    """
+    lines = [
+        '# HELP flask_io_requests_total The number of requests.',
+        '# TYPE flask_io_requests_total counter'
+    ]
+
+    for endpoint, metrics in sorted(snapshot.items()):
+        for status, mimetypes in sorted(metrics['requests'].items()):
+            for mimetype, count in sorted(mimetypes.items()):
+                labels = _format_labels(endpoint=endpoint, status=status, mimetype=mimetype)
+                lines.append('flask_io_requests_total{%s} %d' % (labels, count))
+
+    lines.append('# HELP flask_io_request_duration_seconds The time spent on the requests.')
+    lines.append('# TYPE flask_io_request_duration_seconds histogram')
+
+    for endpoint, metrics in sorted(snapshot.items()):
+        _render_histogram(lines, 'flask_io_request_duration_seconds', metrics['latency'], buckets,
+                          endpoint=endpoint)
+
+    lines.append('# HELP flask_io_phase_duration_seconds The time spent on each phase of the requests.')
+    lines.append('# TYPE flask_io_phase_duration_seconds histogram')
+
+    for endpoint, metrics in sorted(snapshot.items()):
+        for phase, histogram in sorted(metrics['phases'].items()):
+            _render_histogram(lines, 'flask_io_phase_duration_seconds', histogram, buckets,
+                              endpoint=endpoint, phase=phase)
+
+    return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(lines, name, histogram, buckets, **labels):
+    if not histogram:
+        return
+
+    cumulative = 0
+
+    for bound, count in zip(buckets + (None,), histogram['counts']):
+        cumulative += count
+        le = '+Inf' if bound is None else repr(float(bound))
+        lines.append('%s_bucket{%s} %d' % (name, _format_labels(le=le, **labels), cumulative))
+
+    label_text = _format_labels(**labels)
+    lines.append('%s_sum{%s} %r' % (name, label_text, float(histogram['sum'])))
+    lines.append('%s_count{%s} %d' % (name, label_text, histogram['count']))
+
+
+def _merge_histogram(target, source):
+    if target is None:
+        return dict(counts=list(source['counts']), sum=source['sum'], count=source['count'])
+
+    target['counts'] = [a + b for a, b in zip(target['counts'], source['counts'])]
+    target['sum'] += source['sum']
+    target['count'] += source['count']
+    return target
+
+
+def _format_labels(**labels):
+    return ','.join('%s="%s"' % (key, _escape_label(value)) for key, value in sorted(labels.items()))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
@@ -2,12 +2,21 @@
 Handling of mime types, as found in HTTP Content-Type and Accept headers.
 """
 
+from types import MappingProxyType
+from .utils import LRUCache
+
 
 class MimeType(object):
     """
-    Represents a mimetype.
+    Represents an immutable and hashable mimetype.
     """
 
+    __slots__ = ('main_type', 'sub_type', 'params', '_hash', '_str')
+
+    # parsed mimetypes are interned, so the same header value
+    # always returns the same instance.
+    _parse_cache = LRUCache(512)
+
     def __init__(self, main_type, sub_type, params=None):
         """
         Initializes a new instance of MimeType.
@@ -15,9 +24,19 @@ class MimeType(object):
         :param str sub_type: The second part of the mimetype after the slash.
         :param dict params: The parameters of the mimetype.
         """
-        self.main_type = main_type
-        self.sub_type = sub_type
-        self.params = params
+        params = MappingProxyType(dict(params or {}))
+
+        object.__setattr__(self, 'main_type', main_type)
+        object.__setattr__(self, 'sub_type', sub_type)
+        object.__setattr__(self, 'params', params)
+        object.__setattr__(self, '_hash', hash((main_type, sub_type, frozenset(params.items()))))
+        object.__setattr__(self, '_str', None)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('MimeType is immutable.')
+
+    def __delattr__(self, key):
+        raise AttributeError('MimeType is immutable.')
 
     def __eq__(self, other):
         """
@@ -25,22 +44,34 @@ class MimeType(object):
         :param MimeType other: The MimeType to be compared.
         :return: True if both MimeType are equals.
         """
-        if other is None:
+        if self is other:
+            return True
+
+        if not isinstance(other, MimeType):
             return False
 
-        return self.main_type == other.main_type and \
+        return self._hash == other._hash and \
+               self.main_type == other.main_type and \
                self.sub_type == other.sub_type and \
                self.params == other.params
 
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return 'MimeType(%r)' % str(self)
+
     def __str__(self):
         """
         Returns the string representation.
         :return: A string.
         """
-        ret = self.main_type + '/' + self.sub_type
-        for key, val in self.params.items():
-            ret += '; ' + key + '=' + val
-        return ret
+        if self._str is None:
+            ret = self.main_type + '/' + self.sub_type
+            for key, val in self.params.items():
+                ret += '; ' + key + '=' + val
+            object.__setattr__(self, '_str', ret)
+        return self._str
 
     @classmethod
     def parse(cls, mimetype):
@@ -49,6 +80,10 @@ class MimeType(object):
         :param str mimetype: The mimetype to be parsed.
         :return: Returns a tuple with full type and parameters.
         """
+        ret = cls._parse_cache.get(mimetype)
+        if ret is not None:
+            return ret
+
         plist = mimetype.split(';')
 
         main_type, _, sub_type = plist.pop(0).lower().strip().partition('/')
@@ -62,7 +97,9 @@ class MimeType(object):
             if v:
                 params[kv[0].strip()] = v
 
-        return MimeType(main_type, sub_type, params)
+        ret = MimeType(main_type, sub_type, params)
+        cls._parse_cache.set(mimetype, ret)
+        return ret
 
     def match(self, other):
         """
@@ -80,11 +117,12 @@ class MimeType(object):
 
     def replace(self, main_type=None, sub_type=None, params=None):
         """
-        Return a new MimeType with new values for the specified fields.
+        Return a MimeType with new values for the specified fields.
+        The current instance is returned if none of the values changes.
         :param str main_type: The new main type.
         :param str sub_type: The new sub type.
         :param dict params: The new parameters.
-        :return: A new instance of MimeType
+        :return: An instance of MimeType
         """
         if main_type is None:
             main_type = self.main_type
@@ -95,4 +133,7 @@ class MimeType(object):
         if params is None:
             params = self.params
 
+        if main_type == self.main_type and sub_type == self.sub_type and params == self.params:
+            return self
+
         return MimeType(main_type, sub_type, params)
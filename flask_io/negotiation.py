@@ -4,6 +4,7 @@ Content negotiation selects a appropriated parser and renderer for a HTTP reques
 
 from abc import ABCMeta, abstractmethod
 from .mimetypes import MimeType
+from .utils import LRUCache
 
 
 class ContentNegotiation(metaclass=ABCMeta):
@@ -36,8 +37,19 @@ class DefaultContentNegotiation(ContentNegotiation):
     """
     Selects a parser by request content type and a
     renderer by request accept.
+
+    The renderer selected for each distinct accept header is cached,
+    the cache hits and misses are available through `renderer_cache`.
     """
 
+    def __init__(self, cache_size=128):
+        """
+        Initializes a new instance of `DefaultContentNegotiation`.
+
+        :param int cache_size: The maximum number of accept headers cached, `0` disables the cache.
+        """
+        self.renderer_cache = LRUCache(cache_size)
+
     def select_parser(self, request, parsers):
         """
         Selects the appropriated parser which matches to the request's content type.
@@ -64,6 +76,16 @@ class DefaultContentNegotiation(ContentNegotiation):
         :param renderers: The lists of parsers.
         :return: The parser selected or none.
         """
+        key = (request.headers.get('Accept'), tuple(renderers))
+
+        selected = self.renderer_cache.get(key)
+        if selected is None:
+            selected = self.__select_renderer(request, renderers)
+            self.renderer_cache.set(key, selected)
+
+        return selected
+
+    def __select_renderer(self, request, renderers):
         if not len(request.accept_mimetypes):
             return renderers[0], renderers[0].mimetype
 
@@ -3,16 +3,22 @@ Parsers used to parse a byte array into Python object.
 """
 
 from abc import ABCMeta, abstractmethod
-from flask import json
+from io import BytesIO
+from .backends import get_json_backend, OrjsonBackend
+from .errors import PayloadTooLarge
 from .mimetypes import MimeType
 
 
 class Parser(metaclass=ABCMeta):
     """
     Base class for all parsers.
+
+    The data is given as `bytes`, a parser which sets `zero_copy` to True
+    receives a `memoryview` of the body instead.
     """
 
     mimetype = None
+    zero_copy = False
 
     @abstractmethod
     def parse(self, data, mimetype):
@@ -24,6 +30,17 @@ class Parser(metaclass=ABCMeta):
         """
         pass
 
+    def parse_stream(self, stream, mimetype):
+        """
+        Parses the data read from the given stream.
+        By default the whole stream is read and parsed at once.
+        :param stream: A file-like object, e.g. `request.stream`.
+        :param mimetype: The mimetype to parse the data.
+        :return: A Python object
+        """
+        data = stream.read()
+        return self.parse(memoryview(data) if self.zero_copy else data, mimetype)
+
 
 class JSONParser(Parser):
     """
@@ -32,6 +49,19 @@ class JSONParser(Parser):
 
     mimetype = MimeType.parse('application/json')
 
+    def __init__(self, backend=None):
+        """
+        Initializes a new instance of `JSONParser`.
+        :param backend: The JSON backend instance or name, the Flask JSON provider is used by default.
+        """
+        self.backend = get_json_backend(backend)
+
+    @property
+    def zero_copy(self):
+        # orjson reads a memoryview without copying it, the other libraries copy it,
+        # and the subclasses which override `parse` get bytes.
+        return isinstance(self.backend, OrjsonBackend) and type(self).parse is JSONParser.parse
+
     def parse(self, data, mimetype):
         """
         Parses a byte array containing a JSON document and returns a Python object.
@@ -41,4 +71,99 @@ class JSONParser(Parser):
         """
         encoding = mimetype.params.get('charset') or 'utf-8'
 
-        return json.loads(data.decode(encoding))
+        return self.backend.loads(data, encoding)
+
+
+class NDJSONParser(JSONParser):
+    """
+    Parses newline delimited JSON data into a generator of Python objects.
+    """
+
+    mimetype = MimeType.parse('application/x-ndjson')
+
+    def __init__(self, backend=None, max_line_size=1024 * 1024):
+        """
+        Initializes a new instance of `NDJSONParser`.
+        :param backend: The JSON backend instance or name, the Flask JSON provider is used by default.
+        :param int max_line_size: The maximum number of bytes of a line.
+        """
+        super().__init__(backend)
+        self.max_line_size = max_line_size
+
+    def parse(self, data, mimetype):
+        """
+        Parses a byte array containing a JSON document per line and returns a generator of Python objects.
+        :param data: The byte array containing a JSON document per line.
+        :param MimeType mimetype: The mimetype chose to parse the data.
+        :return: A generator of Python objects.
+        """
+        return self.parse_stream(BytesIO(data), mimetype)
+
+    def parse_stream(self, stream, mimetype):
+        """
+        Reads the given stream line by line and returns a generator of Python objects,
+        nothing is read until the generator is consumed and the empty lines are skipped.
+        Raises `PayloadTooLarge` if a line is larger than `max_line_size`.
+        :param stream: A file-like object, e.g. `request.stream`.
+        :param MimeType mimetype: The mimetype chose to parse the data.
+        :return: A generator of Python objects.
+        """
+        encoding = mimetype.params.get('charset') or 'utf-8'
+        max_line_size = self.max_line_size
+
+        while True:
+            line = stream.readline(max_line_size + 1)
+
+            if not line:
+                break
+
+            # the line has been cut if it is larger than the limit without its line break.
+            if len(line) > max_line_size and not line.endswith(b'\n'):
+                raise PayloadTooLarge('A line cannot be larger than %d bytes.' % max_line_size)
+
+            if line.strip():
+                yield self.backend.loads(line, encoding)
+
+
+class MsgPackParser(Parser):
+    """
+    Parses MessagePack data into Python object, it requires the package `msgpack`.
+    """
+
+    mimetype = MimeType.parse('application/msgpack')
+    zero_copy = True
+
+    def __init__(self):
+        import msgpack
+        self.msgpack = msgpack
+
+    def parse(self, data, mimetype):
+        """
+        Parses a byte array containing a MessagePack document and returns a Python object.
+        :param data: The byte array (or memoryview) containing a MessagePack document.
+        :param MimeType mimetype: The mimetype chose to parse the data.
+        :return: A Python object.
+        """
+        return self.msgpack.unpackb(data, raw=False)
+
+
+class CBORParser(Parser):
+    """
+    Parses CBOR data into Python object, it requires the package `cbor2`.
+    """
+
+    mimetype = MimeType.parse('application/cbor')
+    zero_copy = True
+
+    def __init__(self):
+        import cbor2
+        self.cbor2 = cbor2
+
+    def parse(self, data, mimetype):
+        """
+        Parses a byte array containing a CBOR document and returns a Python object.
+        :param data: The byte array (or memoryview) containing a CBOR document.
+        :param MimeType mimetype: The mimetype chose to parse the data.
+        :return: A Python object.
+        """
+        return self.cbor2.loads(data)
@@ -15,6 +15,7 @@ class Permission(metaclass=ABCMeta):
     def has_permission(self):
         """
         Return `True` if permission is granted, `False` otherwise.
+        It can be a coroutine function as well.
         """
         pass
 
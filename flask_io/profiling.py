@@ -0,0 +1,307 @@
+"""
+Statistical profiling of slow or sampled requests.
+"""
+
+import os
+import sys
+
+from collections import Counter
+from itertools import count
+from random import random
+from threading import Event, Lock, get_ident
+from time import perf_counter, sleep, time
+from .tracing import BackgroundEmitter
+from .utils import BackgroundThread
+
+
+class Profiler(object):
+    """
+    Samples the stack of the threads handling the requests being profiled from a background thread.
+
+    A request is profiled once it has been running for longer than `slow_threshold`,
+    so only the slow part of a slow request is sampled, or from the start for a fraction
+    of the requests given by `sample_rate`. The stacks sampled are handed to the sink
+    as a `Profile` by a `BackgroundEmitter` when the request finishes, at most `max_queue_size`
+    profiles wait to be written, the others are dropped.
+    """
+
+    def __init__(self, io, interval=0.005, slow_threshold=None, sample_rate=0.0, max_overhead=0.05,
+                 max_queue_size=100):
+        """
+        Initializes a new instance of `Profiler`.
+
+        :param io: A `FlaskIO` instance.
+        :param float interval: The number of seconds between two samples.
+        :param float slow_threshold: The number of seconds after which a request is profiled, `None` to disable it.
+        :param float sample_rate: The fraction of requests profiled from the start.
+        :param float max_overhead: The maximum fraction of time spent on sampling, the interval is
+                                   increased if the sampling takes longer.
+        :param int max_queue_size: The maximum number of profiles waiting to be written.
+        """
+        self.io = io
+        self.enabled = False
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self.max_overhead = max_overhead
+        self.sink = self.__default_sink
+        self.background = BackgroundEmitter(self, max_queue_size, batch_size=1, name='flask-io-profiler-sink')
+
+        self.samples = 0
+        self.sampling_time = 0.0
+
+        self.__sampler = BackgroundThread(self.__run, _SamplerState, 'flask-io-profiler')
+        self.__sample_lock = Lock()
+
+    @property
+    def emitter(self):
+        # used by the background emitter to write the profiles.
+        return self.sink
+
+    def start(self, latency):
+        """
+        Starts profiling the current thread if the request may need it.
+
+        :param Stopwatch latency: The stopwatch of the request, it must be running.
+        :return: The session to be given to `stop` or `None` if the request is not profiled.
+        """
+        sampled = self.sample_rate > 0 and random() < self.sample_rate
+
+        if not sampled and self.slow_threshold is None:
+            return None
+
+        session = ProfileSession(get_ident(), latency, 0.0 if sampled else self.slow_threshold)
+        state = self.__sampler.ensure_started()
+
+        # a request dispatched within another one, e.g. a batch, runs on the same thread,
+        # so every thread has a stack of sessions.
+        with self.__sample_lock:
+            state.sessions.setdefault(session.thread_id, []).append(session)
+
+        state.wakeup.set()
+
+        return session
+
+    def stop(self, session, endpoint):
+        """
+        Stops profiling the request and queues the profile to be written if any stack has been sampled.
+
+        :param ProfileSession session: The session returned by `start`.
+        :param str endpoint: The endpoint of the request.
+        :return Profile: The profile or `None` if no stack has been sampled.
+        """
+        state = self.__sampler.state
+
+        # once removed the session is not touched by the sampler thread anymore.
+        with self.__sample_lock:
+            sessions = state.sessions.get(session.thread_id, [])
+
+            for i, other in enumerate(sessions):
+                if other is session:
+                    del sessions[i]
+                    break
+
+            if not sessions:
+                state.sessions.pop(session.thread_id, None)
+
+        if not session.stacks:
+            return None
+
+        profile = Profile(endpoint, session.latency.elapsed, session.stacks)
+        self.background.put(profile)
+
+        return profile
+
+    def close(self, timeout=5.0):
+        """
+        Writes the profiles queued.
+
+        :param float timeout: The maximum number of seconds to wait for them.
+        """
+        self.background.close(timeout)
+
+    def __default_sink(self, profile):
+        """
+        Writes the given profile to Python Logging.
+
+        :param Profile profile: The profile to be written.
+        """
+        self.io.logger.info('%s %.5f\r\n%s', profile.endpoint, profile.latency, profile.collapsed())
+
+    def __run(self, state):
+        while True:
+            if not state.sessions:
+                # cleared before checking again, so a session started in between is not missed.
+                state.wakeup.clear()
+                if not state.sessions:
+                    state.wakeup.wait()
+                continue
+
+            started_at = perf_counter()
+            with self.__sample_lock:
+                self.__sample(state)
+            elapsed = perf_counter() - started_at
+
+            self.samples += 1
+            self.sampling_time += elapsed
+
+            # the thread sleeps long enough to keep the time spent sampling under the overhead cap.
+            sleep(max(self.interval, elapsed / self.max_overhead - elapsed))
+
+    def __sample(self, state):
+        frames = None
+
+        for thread_id, sessions in state.sessions.items():
+            stack = None
+
+            for session in sessions:
+                if session.latency.peek() < session.threshold:
+                    continue
+
+                if stack is None:
+                    if frames is None:
+                        frames = sys._current_frames()
+
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        break
+
+                    stack = collapse_stack(frame)
+
+                # the outer requests are running as well, they get the sample too.
+                session.stacks[stack] += 1
+
+
+class _SamplerState(object):
+    """
+    The sessions of the requests being profiled, by thread.
+    """
+
+    __slots__ = ('sessions', 'wakeup')
+
+    def __init__(self):
+        self.sessions = {}
+        self.wakeup = Event()
+
+
+class ProfileSession(object):
+    """
+    The stacks sampled from a thread while it handles a request.
+    """
+
+    __slots__ = ('thread_id', 'latency', 'threshold', 'stacks')
+
+    def __init__(self, thread_id, latency, threshold):
+        """
+        Initializes a new instance of `ProfileSession`.
+
+        :param int thread_id: The identifier of the thread handling the request.
+        :param Stopwatch latency: The stopwatch of the request.
+        :param float threshold: The number of seconds after which the thread is sampled.
+        """
+        self.thread_id = thread_id
+        self.latency = latency
+        self.threshold = threshold
+        self.stacks = Counter()
+
+
+class Profile(object):
+    """
+    The stacks sampled from a request.
+    """
+
+    def __init__(self, endpoint, latency, stacks):
+        """
+        Initializes a new instance of `Profile`.
+
+        :param str endpoint: The endpoint of the request.
+        :param float latency: The time elapsed to process the request.
+        :param Counter stacks: The number of times each collapsed stack has been sampled.
+        """
+        self.endpoint = endpoint
+        self.latency = latency
+        self.stacks = stacks
+
+    def collapsed(self):
+        """
+        Gets the stacks in the collapsed format read by flamegraph.pl and speedscope,
+        a line `frame;frame;frame <count>` per stack from the root to the leaf.
+
+        :return str: The collapsed stacks.
+        """
+        return ''.join('%s %d\n' % (stack, samples) for stack, samples in self.stacks.most_common())
+
+
+class CollapsedStackSink(object):
+    """
+    Writes every profile into its own file in the collapsed stack format,
+    the oldest files are removed to keep at most `max_files` in the directory.
+    """
+
+    def __init__(self, directory, max_files=100):
+        """
+        Initializes a new instance of `CollapsedStackSink`.
+
+        :param str directory: The directory which receives the files.
+        :param int max_files: The maximum number of files kept in the directory.
+        """
+        self.directory = directory
+        self.max_files = max_files
+        self.__counter = count()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, profile):
+        """
+        Writes the given profile into `<endpoint>-<timestamp>-<pid>-<n>.folded`.
+
+        :param Profile profile: The profile.
+        """
+        file_name = '%s-%d-%d-%d.folded' % (str(profile.endpoint).replace(os.sep, '_'), int(time() * 1000),
+                                            os.getpid(), next(self.__counter))
+
+        with open(os.path.join(self.directory, file_name), 'w') as f:
+            f.write(profile.collapsed())
+
+        self.__rotate()
+
+    def __rotate(self):
+        paths = [os.path.join(self.directory, file_name) for file_name in os.listdir(self.directory)
+                 if file_name.endswith('.folded')]
+
+        if len(paths) <= self.max_files:
+            return
+
+        def modified_at(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+
+        paths.sort(key=modified_at)
+
+        for path in paths[:len(paths) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                # removed by another process.
+                pass
+
+
+def collapse_stack(frame):
+    """
+    Collapses the stack of the given frame into a single string, from the root to the leaf.
+
+    :param frame: The innermost frame.
+    :return str: The frames `function (file:line)` separated by semicolons.
+    """
+    names = []
+
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s (%s:%d)' % (code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+
+    names.reverse()
+
+    return ';'.join(names)
@@ -3,7 +3,7 @@ Renderers used to render a Python object into byte array.
 """
 
 from abc import ABCMeta, abstractmethod
-from flask import json
+from .backends import default_encoder, get_json_backend
 from .mimetypes import MimeType
 
 
@@ -24,6 +24,21 @@ class Renderer(metaclass=ABCMeta):
         """
         pass
 
+    def render_stream(self, stream, mimetype):
+        """
+        Renders the chunks of the given stream and returns a generator of byte arrays.
+        By default all the chunks are buffered and rendered at once.
+        :param Stream stream: The stream of items to be rendered.
+        :param mimetype: The mimetype to render the data.
+        :return: A generator of byte arrays.
+        """
+        data = [item for chunk in stream for item in chunk]
+
+        if stream.envelope:
+            data = {stream.envelope: data}
+
+        yield self.render(data, mimetype)
+
 
 class JSONRenderer(Renderer):
     """
@@ -32,6 +47,13 @@ class JSONRenderer(Renderer):
 
     mimetype = MimeType.parse('application/json')
 
+    def __init__(self, backend=None):
+        """
+        Initializes a new instance of `JSONRenderer`.
+        :param backend: The JSON backend instance or name, the Flask JSON provider is used by default.
+        """
+        self.backend = get_json_backend(backend)
+
     def render(self, data, mimetype):
         """
         Serializes a Python object into a byte array containing a JSON document.
@@ -42,7 +64,39 @@ class JSONRenderer(Renderer):
 
         indent = self.__get_indent(mimetype)
         encoding = mimetype.params.get('charset') or 'utf-8'
-        return json.dumps(data, indent=indent).encode(encoding)
+        return self.backend.dumps(data, indent, encoding)
+
+    def render_stream(self, stream, mimetype):
+        """
+        Serializes the chunks of the given stream into a JSON array incrementally.
+        The indent parameter is ignored while streaming.
+        :param Stream stream: The stream of items to be rendered.
+        :param mimetype: The mimetype to render the data.
+        :return: A generator of byte arrays containing a JSON document.
+        """
+        encoding = mimetype.params.get('charset') or 'utf-8'
+
+        # the brackets of every chunk are stripped out, that only
+        # works with encodings where a bracket takes a single byte.
+        if '[]'.encode(encoding) != b'[]':
+            yield from super().render_stream(stream, mimetype)
+            return
+
+        if stream.envelope:
+            yield b'{' + self.backend.dumps(stream.envelope, None, encoding) + b':['
+        else:
+            yield b'['
+
+        separator = b''
+
+        for chunk in stream:
+            if not chunk:
+                continue
+
+            yield separator + self.backend.dumps(chunk, None, encoding)[1:-1]
+            separator = b','
+
+        yield b']}' if stream.envelope else b']'
 
     def __get_indent(self, mimetype):
         """
@@ -56,3 +110,49 @@ class JSONRenderer(Renderer):
             return None
 
         return indent
+
+
+class MsgPackRenderer(Renderer):
+    """
+    Renderer which render into MessagePack, it requires the package `msgpack`.
+    """
+
+    mimetype = MimeType.parse('application/msgpack')
+
+    def __init__(self):
+        import msgpack
+        self.msgpack = msgpack
+
+    def render(self, data, mimetype):
+        """
+        Serializes a Python object into a byte array containing a MessagePack document.
+        :param data: A Python object.
+        :param mimetype: The mimetype to render the data.
+        :return: A byte array containing a MessagePack document.
+        """
+        return self.msgpack.packb(data, use_bin_type=True, default=default_encoder)
+
+
+class CBORRenderer(Renderer):
+    """
+    Renderer which render into CBOR, it requires the package `cbor2`.
+    """
+
+    mimetype = MimeType.parse('application/cbor')
+
+    def __init__(self):
+        import cbor2
+        self.cbor2 = cbor2
+
+    def render(self, data, mimetype):
+        """
+        Serializes a Python object into a byte array containing a CBOR document.
+        :param data: A Python object.
+        :param mimetype: The mimetype to render the data.
+        :return: A byte array containing a CBOR document.
+        """
+        return self.cbor2.dumps(data, default=self.__default)
+
+    @staticmethod
+    def __default(encoder, o):
+        encoder.encode(default_encoder(o))
@@ -2,8 +2,21 @@
 Logging for HTTP requests.
 """
 
-from collections import OrderedDict
-from .utils import format_trace_data
+import atexit
+import json
+import warnings
+
+from abc import ABCMeta, abstractmethod
+from collections.abc import MutableMapping
+from logging import getLogger
+from queue import Empty, Full, Queue
+from random import random
+from threading import Lock
+from time import monotonic
+from weakref import WeakSet
+from werkzeug.datastructures import Headers
+from .errors import PayloadTooLarge
+from .utils import format_trace_data, BackgroundThread
 
 
 class Tracer(object):
@@ -20,40 +33,106 @@ class Tracer(object):
         self.io = io
         self.filters = []
         self.enabled = False
+        self.sample_rate = 1.0
+        self.trace_errors = False
+        self.slow_threshold = None
+        self.rate_limiter = None
+        self.max_body_size = 64 * 1024
         self.inspector = lambda data: None
         self.emitter = self.__default_emit_trace
+        self.background = None
 
-    def add_filter(self, methods=None, endpoints=None):
+    def add_filter(self, methods=None, endpoints=None, sample_rate=None):
         """
         Adds a filter.
 
         :param methods: The HTTP methods to be filtered.
         :param endpoints: The endpoints to be filtered.
+        :param float sample_rate: The fraction of requests traced, the tracer's sample rate is used if it is `None`.
         :return Filter: The filter added.
         """
         if not methods and not endpoints:
             raise ValueError('Filter cannot be added with no criteria.')
 
-        filter = TraceFilter(methods, endpoints)
+        filter = TraceFilter(methods, endpoints, sample_rate)
         self.filters.append(filter)
         return filter
 
+    def set_rate_limit(self, traces_per_second, burst=None):
+        """
+        Limits the number of traces emitted per second, `None` removes the limit.
+
+        :param float traces_per_second: The number of traces per second.
+        :param int burst: The number of traces which can be emitted at once, by default one second worth of traces.
+        """
+        if traces_per_second is None:
+            self.rate_limiter = None
+        else:
+            self.rate_limiter = TokenBucket(traces_per_second, burst)
+
     def match(self, rule):
         """
         Checks if the given rule matches with any filter added.
 
+        Deprecated, use `get_sample_rate` which returns `False` for the rules not traced.
+
         :param rule: The Flask rule to be matched.
         :return: True if there is a filter that matches.
         """
+        warnings.warn('Tracer.match is deprecated, use Tracer.get_sample_rate instead.', DeprecationWarning,
+                      stacklevel=2)
+        return self.get_sample_rate(rule) is not False
+
+    def get_sample_rate(self, rule):
+        """
+        Gets the sample rate of the first filter which matches the given rule.
+
+        :param rule: The Flask rule to be matched.
+        :return: The sample rate of the filter, `None` if the filter has no sample rate
+                 and `False` if the rule is not traced at all.
+        """
         if len(self.filters) == 0:
-            return True
+            return None
 
         for filter in self.filters:
             if filter.match(rule):
-                return True
+                return filter.sample_rate
         return False
 
-    def trace(self, request, response, error, latency):
+    def sample(self, sample_rate, response, error, latency):
+        """
+        Decides whether a request should be traced, it is checked before any tracing data is collected.
+
+        Errors and slow requests are always traced if `trace_errors` and `slow_threshold` are set,
+        any other request is traced based on the sample rate. Every trace is subject to the rate limit.
+
+        :param float sample_rate: The sample rate of the endpoint, the tracer's sample rate is used if it is `None`.
+        :param response: The Flask response.
+        :param error: The error occurred if any.
+        :param latency: The time elapsed to process the request.
+        :return: True if the request should be traced.
+        """
+        forced = False
+
+        if self.trace_errors:
+            forced = error is not None or (response is not None and response.status_code >= 500)
+
+        if not forced and self.slow_threshold is not None:
+            forced = latency.elapsed >= self.slow_threshold
+
+        if not forced:
+            if sample_rate is None:
+                sample_rate = self.sample_rate
+
+            if sample_rate < 1.0 and random() >= sample_rate:
+                return False
+
+        if self.rate_limiter is not None:
+            return self.rate_limiter.acquire()
+
+        return True
+
+    def trace(self, request, response, error, latency, timings=None):
         """
         Collects the data from the given parameters and emit it.
 
@@ -61,40 +140,32 @@ class Tracer(object):
         :param response: The Flask response.
         :param error: The error occurred if any.
         :param latency: The time elapsed to process the request.
+        :param dict timings: The seconds spent on each phase of the request.
         """
 
-        data = self.__collect_trace_data(request, response, error, latency)
+        data = self.__collect_trace_data(request, response, error, latency, timings)
 
         self.inspector(data)
-        self.emitter(data)
 
-    def __collect_trace_data(self, request, response, error, latency):
+        if self.background:
+            # the request is gone by the time the data is emitted.
+            data.detach()
+            self.background.put(data)
+        else:
+            self.emitter(data)
+
+    def __collect_trace_data(self, request, response, error, latency, timings):
         """
         Collects the tracing data from the given parameters.
         :param request: The Flask request.
         :param response: The flask response.
         :param error: The error occurred if any.
         :param latency: The time elapsed to process the request.
+        :param dict timings: The seconds spent on each phase of the request.
         :return: The tracing data.
         """
 
-        data = OrderedDict()
-        data['latency'] = latency.elapsed
-        data['request_method'] = request.environ['REQUEST_METHOD']
-        data['request_url'] = request.url
-        data['request_headers'] = request.headers
-
-        body = request.get_data(as_text=True)
-        if body:
-            data['request_body'] = body
-
-        if response:
-            data['response_status'] = response.status_code
-
-        if error:
-            data['error'] = str(error)
-
-        return data
+        return TraceRecord(request, response, error, latency.elapsed, self.max_body_size, timings)
 
     def __default_emit_trace(self, data):
         """
@@ -106,21 +177,472 @@ class Tracer(object):
         self.io.logger.info(message)
 
 
+class TraceRecord(MutableMapping):
+    """
+    The tracing data of a request.
+
+    It behaves like a dict, the request url, headers and body are only read
+    from the request when they are accessed. Keys without value are omitted.
+    """
+
+    __slots__ = ('latency', 'request_method', 'request_url', 'request_headers', 'request_body',
+                 'response_status', 'timings', 'error', '_request', '_max_body_size', '_extra')
+
+    _keys = ('latency', 'request_method', 'request_url', 'request_headers', 'request_body',
+             'response_status', 'timings', 'error')
+
+    _lazy = object()
+
+    truncated_marker = '...'
+
+    def __init__(self, request, response, error, latency, max_body_size=None, timings=None):
+        """
+        Initializes a new instance of 'TraceRecord'.
+
+        :param request: The Flask request.
+        :param response: The Flask response.
+        :param error: The error occurred if any.
+        :param float latency: The time elapsed to process the request.
+        :param int max_body_size: The maximum number of bytes of the body to be captured, `None` for no limit.
+        :param dict timings: The seconds spent on each phase of the request, e.g. `parse.schema_load` or `render`.
+        """
+        self.latency = latency
+        self.request_method = request.environ['REQUEST_METHOD']
+        self.request_url = self._lazy
+        self.request_headers = self._lazy
+        self.request_body = self._lazy
+        self.response_status = response.status_code if response else None
+        self.timings = timings or None
+        self.error = str(error) if error else None
+        self._request = request
+        self._max_body_size = max_body_size
+        self._extra = None
+
+    def detach(self):
+        """
+        Reads everything needed from the request, so the record can outlive it.
+        """
+        if self._request is None:
+            return
+
+        for key in ('request_url', 'request_headers', 'request_body'):
+            if getattr(self, key) is self._lazy:
+                setattr(self, key, self.__resolve(key))
+
+        if self.request_headers is not None:
+            self.request_headers = Headers(self.request_headers)
+
+        self._request = None
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+
+        value = getattr(self, key)
+
+        if value is self._lazy:
+            value = self.__resolve(key)
+            setattr(self, key, value)
+
+        if value is None:
+            raise KeyError(key)
+
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._keys:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._keys:
+            if getattr(self, key) is None:
+                raise KeyError(key)
+            setattr(self, key, None)
+        else:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+
+    def __iter__(self):
+        for key in self._keys:
+            if key in self:
+                yield key
+
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __resolve(self, key):
+        request = self._request
+
+        if key == 'request_url':
+            return request.url
+
+        if key == 'request_headers':
+            return request.headers
+
+        return self.__read_body(request) or None
+
+    def __read_body(self, request):
+        max_size = self._max_body_size
+
+        if max_size == 0:
+            return None
+
+        length = request.content_length
+
+        if max_size is None or (length is not None and length <= max_size):
+            data = request.get_data()
+        else:
+            try:
+                # only the bytes which can be captured are read, if the stream
+                # has been consumed the body read by the view is cached by the request.
+                data = request.stream.read(max_size + 1) or request.get_data()
+            except PayloadTooLarge:
+                # the body has been rejected for being too large.
+                return None
+
+        if max_size is not None and len(data) > max_size:
+            return data[:max_size].decode(request.charset, 'replace') + self.truncated_marker
+
+        return data.decode(request.charset, 'replace')
+
+
+class StructuredEmitter(metaclass=ABCMeta):
+    """
+    Base class for the emitters which write every tracing data as a single line.
+    """
+
+    def __init__(self, logger=None, stream=None, include_headers=None, exclude_headers=None,
+                 redact=('Authorization', 'Cookie'), redacted_value='***'):
+        """
+        Initializes a new instance of 'StructuredEmitter'.
+
+        :param logger: The Python logger which receives the lines, `flask-io` by default.
+        :param stream: A file-like object which receives the lines instead of the logger.
+        :param include_headers: The names of the request headers to be emitted, all of them by default.
+        :param exclude_headers: The names of the request headers not to be emitted.
+        :param redact: The names of the request headers or tracing data keys whose values are hidden.
+        :param str redacted_value: The value which replaces the values hidden.
+        """
+        self.logger = logger or getLogger('flask-io')
+        self.stream = stream
+        self.include_headers = _lower_set(include_headers)
+        self.exclude_headers = _lower_set(exclude_headers) or frozenset()
+        self.redact = _lower_set(redact) or frozenset()
+        self.redacted_value = redacted_value
+
+    def __call__(self, data):
+        """
+        Writes the given tracing data.
+
+        :param data: The tracing data to be written.
+        """
+        self.write(self.format(self.__fields(data)))
+
+    def emit_batch(self, batch):
+        """
+        Writes a list of tracing data, at once to a stream.
+
+        :param batch: The list of tracing data to be written.
+        """
+        lines = [self.format(self.__fields(data)) for data in batch]
+
+        # the formatters of a logger only prefix the first line of a record, so each line is a record.
+        if self.stream is None:
+            for line in lines:
+                self.logger.info(line)
+            return
+
+        self.write('\n'.join(lines))
+
+    def write(self, text):
+        """
+        Writes the given lines to the stream or logger.
+
+        :param str text: The lines to be written.
+        """
+        if self.stream is not None:
+            self.stream.write(text + '\n')
+        else:
+            self.logger.info(text)
+
+    @abstractmethod
+    def format(self, fields):
+        """
+        Formats a list of key-value pairs into a line.
+
+        :param fields: The list of key-value pairs, the request headers are a list of key-value pairs as well.
+        :return str: The line.
+        """
+        pass
+
+    def __fields(self, data):
+        fields = []
+
+        for key, value in data.items():
+            if key.lower() in self.redact:
+                value = self.redacted_value
+            elif key == 'request_headers':
+                value = self.__headers(value)
+            fields.append((key, value))
+
+        return fields
+
+    def __headers(self, headers):
+        ret = []
+
+        for key, value in headers.items():
+            name = key.lower()
+
+            if self.include_headers is not None and name not in self.include_headers:
+                continue
+
+            if name in self.exclude_headers:
+                continue
+
+            if name in self.redact:
+                value = self.redacted_value
+
+            ret.append((key, value))
+
+        return ret
+
+
+class JSONLinesEmitter(StructuredEmitter):
+    """
+    Writes every tracing data as a JSON document in a line.
+    """
+
+    def format(self, fields):
+        data = {}
+        for key, value in fields:
+            data[key] = dict(value) if key == 'request_headers' else value
+        return json.dumps(data, default=str, separators=(',', ':'))
+
+
+class LogfmtEmitter(StructuredEmitter):
+    """
+    Writes every tracing data as logfmt, the request headers are written as `header.<name>=<value>`
+    and the timings as `timing.<phase>=<seconds>`.
+    """
+
+    def format(self, fields):
+        parts = []
+
+        for key, value in fields:
+            if key == 'request_headers':
+                for name, header_value in value:
+                    parts.append('header.' + name.lower() + '=' + self.__quote(header_value))
+            elif key == 'latency':
+                parts.append(key + '=' + '%.5f' % value)
+            elif key == 'timings':
+                for name, elapsed in value.items():
+                    parts.append('timing.' + name + '=' + '%.5f' % elapsed)
+            else:
+                parts.append(key + '=' + self.__quote(value))
+
+        return ' '.join(parts)
+
+    def __quote(self, value):
+        value = str(value)
+
+        if not value:
+            return '""'
+
+        if ' ' in value or '=' in value or '"' in value or '\n' in value or '\\' in value:
+            return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+        return value
+
+
+emitters = {
+    'json': JSONLinesEmitter,
+    'logfmt': LogfmtEmitter
+}
+
+
+class BackgroundEmitter(object):
+    """
+    Emits the tracing data in batches from a worker thread, so requests do not wait for it.
+
+    The tracing data is queued and handed to the tracer's emitter, if the emitter has
+    a method `emit_batch` the whole batch is given at once. It is also used by the profiler
+    to write the profiles.
+    """
+
+    DROP_NEW = 'drop_new'
+    DROP_OLDEST = 'drop_oldest'
+    BLOCK = 'block'
+
+    _stop = object()
+
+    def __init__(self, tracer, max_queue_size=10000, batch_size=100, flush_interval=1.0, drop_policy=DROP_NEW,
+                 name='flask-io-tracer'):
+        """
+        Initializes a new instance of `BackgroundEmitter`.
+
+        :param Tracer tracer: The tracer whose emitter writes the tracing data,
+                              or any object with an `emitter` and an `io`, e.g. the profiler.
+        :param int max_queue_size: The maximum number of tracing data waiting to be emitted.
+        :param int batch_size: The number of tracing data which triggers a flush.
+        :param float flush_interval: The maximum number of seconds the tracing data waits in a batch.
+        :param str drop_policy: What happens when the queue is full, `drop_new`, `drop_oldest` or `block`.
+        :param str name: The name of the worker thread.
+        """
+        if drop_policy not in (self.DROP_NEW, self.DROP_OLDEST, self.BLOCK):
+            raise ValueError('Invalid drop policy: %s' % drop_policy)
+
+        self.tracer = tracer
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+
+        self.emitted = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self.__worker = BackgroundThread(self.__run, lambda: Queue(self.max_queue_size), name)
+        self.__counters_lock = Lock()
+
+        # closed at exit, the emitters discarded are still garbage collected.
+        _background_emitters.add(self)
+
+    def put(self, data):
+        """
+        Queues the given tracing data to be emitted.
+
+        :param data: The tracing data.
+        :return bool: False if the tracing data has been dropped.
+        """
+        queue = self.__worker.ensure_started()
+
+        if self.drop_policy == self.BLOCK:
+            queue.put(data)
+            return True
+
+        try:
+            queue.put_nowait(data)
+            return True
+        except Full:
+            pass
+
+        if self.drop_policy == self.DROP_OLDEST:
+            try:
+                queue.get_nowait()
+                queue.put_nowait(data)
+            except (Empty, Full):
+                pass
+
+        with self.__counters_lock:
+            self.dropped += 1
+        return False
+
+    def close(self, timeout=5.0):
+        """
+        Emits the tracing data queued and stops the worker thread.
+
+        :param float timeout: The maximum number of seconds to wait for the worker thread.
+        """
+        worker = self.__worker.detach()
+        if worker is None:
+            return
+
+        thread, queue = worker
+        deadline = monotonic() + timeout
+
+        try:
+            # the queue may be full, waiting for it forever could hang the interpreter exit.
+            queue.put(self._stop, timeout=timeout)
+        except Full:
+            return
+
+        thread.join(max(deadline - monotonic(), 0))
+
+    def __run(self, queue):
+        batch = []
+        deadline = monotonic() + self.flush_interval
+
+        while True:
+            try:
+                data = queue.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                data = None
+
+            if data is self._stop:
+                self.__flush(batch)
+                return
+
+            if data is not None:
+                batch.append(data)
+
+            if len(batch) >= self.batch_size or monotonic() >= deadline:
+                self.__flush(batch)
+                batch = []
+                deadline = monotonic() + self.flush_interval
+
+    def __flush(self, batch):
+        if not batch:
+            return
+
+        emitter = self.tracer.emitter
+
+        try:
+            if hasattr(emitter, 'emit_batch'):
+                emitter.emit_batch(batch)
+            else:
+                for data in batch:
+                    emitter(data)
+            with self.__counters_lock:
+                self.emitted += len(batch)
+        except Exception:
+            with self.__counters_lock:
+                self.failed += len(batch)
+            self.tracer.io.logger.exception('Failed to emit the tracing data.')
+
+
+_background_emitters = WeakSet()
+
+
+@atexit.register
+def _close_background_emitters():
+    for emitter in list(_background_emitters):
+        emitter.close()
+
+
 class TraceFilter(object):
     """
     A tracing filter.
     """
 
-    def __init__(self, methods, endpoints):
+    def __init__(self, methods, endpoints, sample_rate=None):
         """
         Initializes a new instance 'TraceFilter'.
 
         :param methods: HTTP methods to be filtered.
         :param endpoints: Endpoint names to be filtered.
+        :param float sample_rate: The fraction of requests traced.
         """
 
         self.methods = methods
         self.endpoints = endpoints
+        self.sample_rate = sample_rate
 
     def match(self, rule):
         """
@@ -140,3 +662,45 @@ class TraceFilter(object):
                     return True
 
         return False
+
+
+class TokenBucket(object):
+    """
+    A token bucket used to rate limit the traces.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initializes a new instance of 'TokenBucket'.
+
+        :param float rate: The number of tokens added per second.
+        :param float capacity: The maximum number of tokens, by default one second worth of tokens.
+        """
+        self.rate = rate
+        self.capacity = max(capacity or rate, 1)
+        self.tokens = self.capacity
+        self.__last = monotonic()
+        self.__lock = Lock()
+
+    def acquire(self):
+        """
+        Takes a token from the bucket.
+
+        :return: True if a token was available.
+        """
+        with self.__lock:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.__last) * self.rate)
+            self.__last = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+
+def _lower_set(names):
+    if names is None:
+        return None
+    return frozenset(name.lower() for name in names)
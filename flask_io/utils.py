@@ -1,12 +1,17 @@
+import os
 import sys
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
 from collections.abc import Mapping, Sequence
+from threading import Lock, Thread
 
 from flask import request
-from time import perf_counter
-from marshmallow.exceptions import SCHEMA
+from time import monotonic, perf_counter
+from marshmallow.exceptions import SCHEMA, ValidationError
 from werkzeug.http import HTTP_STATUS_CODES
 
-from .errors import Error
+from .errors import Error, PayloadTooLarge
 
 
 def _raise_typeerror(error):
@@ -36,6 +41,30 @@ def errors_to_dict(errors):
     return dict(errors=errors_data)
 
 
+def compute_etag(data):
+    """
+    Computes an ETag from the given bytes with a fast non-cryptographic checksum,
+    it should only be used as a weak ETag.
+    """
+    return '%x-%08x' % (len(data), zlib.crc32(data))
+
+
+def format_server_timing(timings, latency=None):
+    """
+    Formats the time spent on each phase of a request as the value of the header Server-Timing.
+
+    :param dict timings: The seconds by phase.
+    :param float latency: The seconds spent on the whole request, it is added as `total`.
+    :return str: The header value, the durations are in milliseconds.
+    """
+    parts = ['%s;dur=%.3f' % (name, elapsed * 1000) for name, elapsed in timings.items()]
+
+    if latency is not None:
+        parts.append('total;dur=%.3f' % (latency * 1000))
+
+    return ', '.join(parts)
+
+
 def format_trace_data(data):
     request_method = data.pop('request_method', None)
     request_url = data.pop('request_url', None)
@@ -43,37 +72,44 @@ def format_trace_data(data):
     request_headers = data.pop('request_headers', None)
     request_body = data.pop('request_body', None)
     response_status = data.pop('response_status', None)
+    timings = data.pop('timings', None)
     error = data.pop('error', None)
 
-    message = ''
+    # the parts are joined once at the end rather than concatenated one by one.
+    parts = []
 
     if request_method:
-        message += request_method + ' '
+        parts.append(request_method + ' ')
 
     if request_url:
-        message += request_url + ' '
+        parts.append(request_url + ' ')
 
     if response_status:
-        message += str(response_status) + ' '
+        parts.append(str(response_status) + ' ')
 
     if latency:
-        message += '%.5f' % latency
+        parts.append('%.5f' % latency)
+
+    parts.append('\r\n')
 
-    message += '\r\n'
+    if timings:
+        parts.append('timings: ')
+        parts.append(' '.join('%s=%.5f' % (name, elapsed) for name, elapsed in timings.items()))
+        parts.append('\r\n')
 
     for key, value in data.items():
-        message += key + ': ' + str(value) + '\r\n'
+        parts.extend((key, ': ', str(value), '\r\n'))
 
     if request_headers:
         for key, value in request_headers.items():
-            message += key + ': ' + str(value) + '\r\n'
+            parts.extend((key, ': ', str(value), '\r\n'))
 
     if error:
-        message += '\r\n' + error
+        parts.extend(('\r\n', error))
     elif request_body:
-        message += '\r\n' + request_body
+        parts.extend(('\r\n', request_body))
 
-    return message
+    return ''.join(parts)
 
 
 def get_fields_from_request(schema=None):
@@ -81,13 +117,15 @@ def get_fields_from_request(schema=None):
     if not fields:
         return ()
 
-    field_names = fields.split(',')
+    field_names = set(field_name.strip() for field_name in fields.split(','))
 
     if schema:
+        # nested fields are given as dotted paths, e.g. 'author.name'
         declared_fields = schema._declared_fields
-        field_names = [field_name for field_name in field_names if field_name in declared_fields]
+        field_names = [field_name for field_name in field_names
+                       if field_name.partition('.')[0] in declared_fields]
 
-    return tuple(field_names)
+    return tuple(sorted(field_name for field_name in field_names if field_name))
 
 
 def http_status_message(code):
@@ -105,6 +143,51 @@ def marshal(data, schema, envelope=None):
     return data
 
 
+def marshal_stream(data, schema, envelope=None, chunk_size=1000):
+    if data is None or isinstance(data, (Mapping, str, bytes)):
+        return marshal(data, schema, envelope)
+
+    return Stream(data, schema, envelope, chunk_size)
+
+
+def unmarshal_stream(items, schema, chunk_size=1000, location='body'):
+    """
+    Deserializes the given items in chunks as they are consumed.
+
+    The errors of a chunk are raised when it is reached, keyed by the index of the item in `items`.
+
+    :param items: An iterable or generator of items.
+    :param schema: The schema used to deserialize the items.
+    :param int chunk_size: The number of items deserialized at once.
+    :param str location: The location of the items in the request.
+    :return: A generator of deserialized items.
+    """
+    chunk = []
+    offset = 0
+
+    for item in items:
+        chunk.append(item)
+
+        if len(chunk) >= chunk_size:
+            yield from _unmarshal_chunk(chunk, schema, offset, location)
+            offset += len(chunk)
+            chunk = []
+
+    if chunk:
+        yield from _unmarshal_chunk(chunk, schema, offset, location)
+
+
+def _unmarshal_chunk(chunk, schema, offset, location):
+    try:
+        with get_timings().phase('parse.schema_load'):
+            return schema.load(chunk, many=True)
+    except ValidationError as e:
+        if offset and isinstance(e.messages, dict):
+            e.messages = {(offset + key if isinstance(key, int) else key): value for key, value in e.messages.items()}
+        e.kwargs['location'] = location
+        raise
+
+
 def reraise():
     _, exc_value, tb = sys.exc_info()
     if exc_value.__traceback__ is not tb:
@@ -128,21 +211,188 @@ def validation_error_to_errors(validation_error):
 
     else:
         for field, error in validation_error.messages.items():
-            validation_error_to_error(field, error, validation_error.kwargs.get('location'), errors)
+            # the errors of a collection are keyed by the index of the item.
+            if isinstance(field, int) and isinstance(error, dict):
+                for f, e in error.items():
+                    validation_error_to_error(f, e, validation_error.kwargs.get('location'), errors, field)
+            else:
+                validation_error_to_error(field, error, validation_error.kwargs.get('location'), errors)
 
     return errors
 
 
-def validation_error_to_error(field, error, location, errors):
+def validation_error_to_error(field, error, location, errors, index=None):
     if isinstance(error, dict):
         for f, e in error.items():
-            validation_error_to_error(f, e, location, errors)
+            validation_error_to_error(f, e, location, errors, index)
     elif isinstance(error, Sequence):
         error = error[0]
         if isinstance(error, str):
-            errors.append(Error(error, location=location, field=field))
+            errors.append(Error(error, location=location, field=field, index=index))
         elif isinstance(error, dict):
-            errors.append(Error(error.get('message'), error.get('code'), location, field))
+            errors.append(Error(error.get('message'), error.get('code'), location, field, index=index))
+
+
+class Stream(object):
+    """
+    An iterable of items which is serialized in chunks while the response is being sent.
+    """
+
+    def __init__(self, items, schema=None, envelope=None, chunk_size=1000):
+        """
+        Initializes a new instance of `Stream`.
+
+        :param items: An iterable or generator of items.
+        :param schema: The schema used to serialize the items.
+        :param envelope: The key used to envelope the items.
+        :param int chunk_size: The number of items serialized at once.
+        """
+        self.items = items
+        self.schema = schema
+        self.envelope = envelope
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        """
+        Iterates over the chunks of serialized items.
+
+        :return: A generator of lists.
+        """
+        chunk = []
+
+        for item in self.items:
+            chunk.append(item)
+
+            if len(chunk) >= self.chunk_size:
+                yield self.__dump(chunk)
+                chunk = []
+
+        if chunk:
+            yield self.__dump(chunk)
+
+    def __dump(self, chunk):
+        if self.schema is None:
+            return chunk
+        return self.schema.dump(chunk, many=True)
+
+
+class LRUCache(object):
+    """
+    A thread-safe, bounded mapping that evicts the least recently used entry.
+    Entries can optionally expire after a number of seconds.
+    """
+
+    def __init__(self, max_size=128, ttl=None, on_remove=None):
+        """
+        Initializes a new instance of `LRUCache`.
+
+        :param int max_size: The maximum number of entries, `0` disables the cache.
+        :param float ttl: The default number of seconds an entry lives, `None` for no expiration.
+        :param on_remove: A function called with the key and the value of every entry evicted,
+                          expired, replaced or popped, it is not called by `clear`.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_remove = on_remove
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """
+        Gets the value for the given key and marks it as the most recently used.
+
+        :param key: The key to look up.
+        :param default: The value returned if the key is not found or has expired.
+        :return: The value cached or the default value.
+        """
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires_at is not None and expires_at <= monotonic():
+                del self._data[key]
+                self.misses += 1
+                expired = True
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if expired and self.on_remove is not None:
+            self.on_remove(key, value)
+
+        return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Adds or replaces the value for the given key, evicting the oldest entry if needed.
+
+        :param key: The key.
+        :param value: The value to be cached.
+        :param float ttl: The number of seconds the entry lives, the default ttl is used if it is `None`.
+        """
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else monotonic() + ttl
+
+        removed = []
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                removed.append((key, entry[0]))
+
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                old_key, (old_value, _) = self._data.popitem(last=False)
+                removed.append((old_key, old_value))
+
+        # called without holding the lock, so the function can use the cache.
+        if self.on_remove is not None:
+            for old_key, old_value in removed:
+                self.on_remove(old_key, old_value)
+
+    def pop(self, key, default=None):
+        """
+        Removes the given key from the cache.
+
+        :param key: The key to be removed.
+        :param default: The value returned if the key is not found.
+        :return: The value removed or the default value.
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+
+        if entry is None:
+            return default
+
+        if self.on_remove is not None:
+            self.on_remove(key, entry[0])
+
+        return entry[0]
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
 
 
 class Stopwatch(object):
@@ -169,6 +419,15 @@ class Stopwatch(object):
     def reset(self):
         self.elapsed = 0.0
 
+    def peek(self):
+        """
+        Gets the seconds elapsed including the current run, without stopping the stopwatch.
+        """
+        start = self._start
+        if start:
+            return self.elapsed + (perf_counter() - start)
+        return self.elapsed
+
     @property
     def running(self):
         return self._start is not None
@@ -179,3 +438,160 @@ class Stopwatch(object):
 
     def __exit__(self, *args):
         self.stop()
+
+
+class Timings(object):
+    """
+    The time spent in each phase of a request, every phase is measured by a `Stopwatch`.
+    """
+
+    __slots__ = ('stopwatches',)
+
+    def __init__(self):
+        self.stopwatches = {}
+
+    def phase(self, name):
+        """
+        Gets the stopwatch of the given phase, it is used as a context manager around the phase.
+
+        :param str name: The name of the phase.
+        :return Stopwatch: The stopwatch, the time of every use is accumulated.
+        """
+        stopwatch = self.stopwatches.get(name)
+        if stopwatch is None:
+            stopwatch = self.stopwatches[name] = Stopwatch()
+        return stopwatch
+
+    def as_dict(self):
+        """
+        Gets the number of seconds spent in each phase.
+
+        :return dict: The seconds by phase.
+        """
+        return {name: stopwatch.elapsed for name, stopwatch in self.stopwatches.items()}
+
+
+class _NullTimings(object):
+    """
+    Used when the phases of a request are not being measured.
+    """
+
+    __slots__ = ()
+
+    def phase(self, name):
+        return _null_phase
+
+    def as_dict(self):
+        return {}
+
+
+_null_phase = nullcontext()
+_null_timings = _NullTimings()
+
+
+def get_timings():
+    """
+    Gets the timings of the current request.
+
+    :return: The `Timings` or an object which measures nothing if the request is not being measured.
+    """
+    return request.environ.get('flask_io.timings', _null_timings)
+
+
+class BackgroundThread(object):
+    """
+    A daemon thread which is started on demand.
+
+    The thread does not survive a fork, so a new one is started with a new state in the child process.
+    """
+
+    def __init__(self, target, make_state, name):
+        """
+        Initializes a new instance of `BackgroundThread`.
+
+        :param target: The function run by the thread, it receives the state.
+        :param make_state: A function which returns the state shared by the thread and its callers, e.g. a queue.
+        :param str name: The name of the thread.
+        """
+        self.target = target
+        self.make_state = make_state
+        self.name = name
+        self.state = None
+        self.__thread = None
+        self.__pid = None
+        self.__lock = Lock()
+
+    def ensure_started(self):
+        """
+        Starts the thread if it is not running in this process.
+
+        :return: The state of the thread.
+        """
+        if self.__thread is not None and self.__pid == os.getpid():
+            return self.state
+
+        with self.__lock:
+            if self.__thread is None or self.__pid != os.getpid():
+                self.state = self.make_state()
+                self.__pid = os.getpid()
+                self.__thread = Thread(target=self.target, args=(self.state,), name=self.name, daemon=True)
+                self.__thread.start()
+
+        return self.state
+
+    def detach(self):
+        """
+        Forgets the thread of this process, so a new one is started on demand, the caller stops it.
+
+        :return: A tuple with the thread and its state or `None` if it is not running in this process.
+        """
+        with self.__lock:
+            thread = self.__thread
+            if thread is None or self.__pid != os.getpid():
+                return None
+
+            self.__thread = None
+            return thread, self.state
+
+
+class SizeLimitedStream(object):
+    """
+    Wraps a stream and raises `PayloadTooLarge` as soon as more bytes than the limit are read from it.
+    """
+
+    def __init__(self, stream, max_size, chunk_size=64 * 1024):
+        """
+        Initializes a new instance of `SizeLimitedStream`.
+
+        :param stream: The file-like object to be read.
+        :param int max_size: The maximum number of bytes.
+        :param int chunk_size: The number of bytes read at once when the whole stream is read.
+        """
+        self.stream = stream
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.size = 0
+
+    def read(self, size=None):
+        if size is not None and size >= 0:
+            return self.__count(self.stream.read(size))
+
+        chunks = []
+
+        while True:
+            # at most one byte over the limit is read.
+            chunk = self.__count(self.stream.read(min(self.chunk_size, self.max_size - self.size + 1)))
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    def readline(self, size=None):
+        return self.__count(self.stream.readline(size))
+
+    def __count(self, data):
+        self.size += len(data)
+
+        if self.size > self.max_size:
+            raise PayloadTooLarge('Request payload cannot be larger than %d bytes.' % self.max_size)
+
+        return data
@@ -11,6 +11,7 @@ setup(
     description='Flask-IO is a library for parsing Flask request arguments into parameters and for serialization of complex objects into Flask response.',
     keywords=['flask', 'rest', 'parse', 'encode', 'decode', 'request', 'json', 'marshmallow'],
     install_requires=['flask>=2,<3', 'python-dateutil>=2.4.2', 'marshmallow>=3,<4'],
+    extras_require={'msgpack': ['msgpack>=1.0'], 'cbor': ['cbor2>=5']},
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
@@ -0,0 +1,153 @@
+import asyncio
+import functools
+import json
+
+from flask import Flask, request
+from flask_io import FlaskIO, fields, Schema
+from flask_io.authentication import Authenticator
+from flask_io.permissions import Permission
+from unittest import TestCase
+
+
+class TestActions(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def test_compiled_pipeline(self):
+        @self.app.route('/resource')
+        @self.io.from_query('name', fields.String())
+        @self.io.from_header('token', fields.String(data_key='X-Token'))
+        @self.io.marshal_with(UserSchema)
+        def test(name, token):
+            return dict(username=name + token)
+
+        response = self.client.get('/resource?name=foo', headers={'X-Token': 'bar'})
+        self.assertEqual(dict(username='foobar'), json.loads(response.get_data(as_text=True)))
+
+        action = self.io.actions['test']
+        self.assertEqual(['name', 'token'], [step.param_name for step in action.inputs])
+        self.assertEqual(1, len(action.outputs))
+        self.assertIs(test.__wrapped__.__wrapped__.__wrapped__, action.view)
+
+    def test_foreign_decorator(self):
+        def foreign(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return func(*args, **kwargs)
+            return wrapper
+
+        @self.app.route('/resource')
+        @self.io.from_query('name', fields.String())
+        @foreign
+        @self.io.from_query('limit', fields.Integer())
+        def test(name, limit):
+            return dict(name=name, limit=limit)
+
+        response = self.client.get('/resource?name=foo&limit=2')
+        self.assertEqual(dict(name='foo', limit=2), json.loads(response.get_data(as_text=True)))
+
+        action = self.io.actions['test']
+        self.assertEqual(['name'], [step.param_name for step in action.inputs])
+
+    def test_shared_decorator(self):
+        name = self.io.from_query('name', fields.String())
+        marshal = self.io.marshal_with(UserSchema)
+
+        @self.app.route('/first')
+        @name
+        @marshal
+        def first(name):
+            return dict(username=name)
+
+        @self.app.route('/second')
+        @name
+        @marshal
+        def second(name):
+            return dict(username=name)
+
+        self.client.get('/first?name=foo')
+
+        # both functions are compiled, each one with its own steps.
+        for endpoint in ('first', 'second'):
+            action = self.io.actions[endpoint]
+            self.assertEqual(['name'], [step.param_name for step in action.inputs])
+            self.assertEqual(1, len(action.outputs))
+
+        self.assertIsNot(self.io.actions['first'].inputs[0], self.io.actions['second'].inputs[0])
+
+    def test_describe(self):
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.from_body('user', UserSchema)
+        @self.io.marshal_with(UserSchema, envelope='user')
+        def test(user):
+            return user
+
+        self.client.post('/resource', data=json.dumps(dict(username='foo')))
+
+        description = self.io.describe()['test']
+
+        self.assertEqual([dict(name='user', location='body', type='UserSchema')], description['inputs'])
+        self.assertEqual('UserSchema', description['outputs'][0]['schema'])
+        self.assertEqual('user', description['outputs'][0]['envelope'])
+        self.assertEqual([], description['authenticators'])
+
+
+class TestAsyncActions(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def test_async_view(self):
+        async def fetch(value):
+            await asyncio.sleep(0)
+            return value
+
+        @self.app.route('/resource')
+        @self.io.from_query('name', fields.String())
+        @self.io.marshal_with(UserSchema, envelope='users')
+        async def test(name):
+            names = await asyncio.gather(fetch(name), fetch(name.upper()))
+            return [dict(username=name) for name in names]
+
+        response = self.client.get('/resource?name=foo')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(dict(users=[dict(username='foo'), dict(username='FOO')]),
+                         json.loads(response.get_data(as_text=True)))
+        self.assertTrue(self.io.describe()['test']['is_async'])
+
+    def test_async_authentication(self):
+        @self.app.route('/resource')
+        @self.io.authenticators(AsyncTokenAuthenticator)
+        @self.io.permissions(AsyncIsAuthenticated)
+        def test():
+            return dict(user=request.user)
+
+        response = self.client.get('/resource')
+        self.assertEqual(401, response.status_code)
+
+        response = self.client.get('/resource', headers={'Authorization': 'token'})
+        self.assertEqual(dict(user='user'), json.loads(response.get_data(as_text=True)))
+
+
+class AsyncTokenAuthenticator(Authenticator):
+    async def authenticate(self):
+        await asyncio.sleep(0)
+        if request.headers.get('Authorization') is None:
+            return None
+        return 'user', 'auth'
+
+
+class AsyncIsAuthenticated(Permission):
+    async def has_permission(self):
+        await asyncio.sleep(0)
+        return request.user is not None
+
+
+class UserSchema(Schema):
+    username = fields.String()
@@ -1,6 +1,8 @@
+import asyncio
+
 from flask import Flask, request
 from flask_io import FlaskIO, errors
-from flask_io.authentication import Authenticator
+from flask_io.authentication import Authenticator, CachedAuthenticator
 from unittest import TestCase
 
 
@@ -29,6 +31,130 @@ class TestAuthorization(TestCase):
         self.assertEqual(response.status_code, 401)
 
 
+class TestCachedAuthenticator(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def add_route(self, authenticator):
+        @self.app.route('/resource', methods=['GET'])
+        @self.io.authenticators(authenticator)
+        def test():
+            return request.user
+
+    def test_cached(self):
+        authenticator = CountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator))
+
+        for _ in range(3):
+            response = self.client.get('/resource', headers={'Authorization': 'token1'})
+            self.assertEqual(b'"token1"', response.get_data())
+
+        response = self.client.get('/resource', headers={'Authorization': 'token2'})
+        self.assertEqual(b'"token2"', response.get_data())
+
+        self.assertEqual(['token1', 'token2'], authenticator.calls)
+
+    def test_ttl(self):
+        authenticator = CountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator, ttl=0))
+
+        self.client.get('/resource', headers={'Authorization': 'token1'})
+        self.client.get('/resource', headers={'Authorization': 'token1'})
+        self.assertEqual(2, len(authenticator.calls))
+
+    def test_max_size(self):
+        authenticator = CountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator, max_size=1))
+
+        for token in ('token1', 'token2', 'token1'):
+            self.client.get('/resource', headers={'Authorization': token})
+        self.assertEqual(3, len(authenticator.calls))
+
+    def test_negative_cache(self):
+        authenticator = CountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator, negative_ttl=60))
+
+        for _ in range(2):
+            response = self.client.get('/resource', headers={'Authorization': 'invalid'})
+            self.assertEqual(401, response.status_code)
+        self.assertEqual(['invalid'], authenticator.calls)
+
+    def test_no_negative_cache(self):
+        authenticator = CountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator))
+
+        for _ in range(2):
+            response = self.client.get('/resource', headers={'Authorization': 'invalid'})
+            self.assertEqual(401, response.status_code)
+        self.assertEqual(['invalid', 'invalid'], authenticator.calls)
+
+    def test_without_credentials(self):
+        authenticator = CountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator))
+
+        self.client.get('/resource')
+        self.client.get('/resource')
+        self.assertEqual([None, None], authenticator.calls)
+
+    def test_revoke(self):
+        authenticator = CountingAuthenticator()
+        cached = CachedAuthenticator(authenticator)
+        self.add_route(cached)
+
+        self.client.get('/resource', headers={'Authorization': 'token1'})
+        cached.revoke('token1')
+        self.client.get('/resource', headers={'Authorization': 'token1'})
+        cached.clear()
+        self.client.get('/resource', headers={'Authorization': 'token1'})
+        self.assertEqual(3, len(authenticator.calls))
+
+    def test_default_authenticators(self):
+        authenticator = CountingAuthenticator()
+        self.io.default_authenticators.append(CachedAuthenticator(authenticator))
+
+        @self.app.route('/resource', methods=['GET'])
+        def test():
+            return request.user
+
+        for _ in range(2):
+            response = self.client.get('/resource', headers={'Authorization': 'token1'})
+            self.assertEqual(b'"token1"', response.get_data())
+        self.assertEqual(1, len(authenticator.calls))
+
+    def test_async(self):
+        authenticator = AsyncCountingAuthenticator()
+        self.add_route(CachedAuthenticator(authenticator))
+
+        for _ in range(2):
+            response = self.client.get('/resource', headers={'Authorization': 'token1'})
+            self.assertEqual(b'"token1"', response.get_data())
+        self.assertEqual(1, len(authenticator.calls))
+
+
+class CountingAuthenticator(Authenticator):
+    def __init__(self):
+        self.calls = []
+
+    def authenticate(self):
+        token = request.headers.get('Authorization')
+        self.calls.append(token)
+
+        if token == 'invalid':
+            raise errors.AuthenticationFailed()
+        if token is None:
+            return None
+        return token, token
+
+
+class AsyncCountingAuthenticator(CountingAuthenticator):
+    async def authenticate(self):
+        await asyncio.sleep(0)
+        return super().authenticate()
+
+
 class TokenAuthenticator(Authenticator):
     def authenticate(self):
         if request.headers.get('Authorization') is None:
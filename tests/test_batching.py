@@ -0,0 +1,149 @@
+import json
+
+from flask import Flask, abort, request
+from flask_io import FlaskIO, fields, Schema
+from unittest import TestCase
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+        @self.app.route('/users/<username>')
+        @self.io.from_header('token', fields.String(data_key='Authorization'))
+        @self.io.marshal_with(UserSchema)
+        def get_user(username, token):
+            return dict(username=username, token=token)
+
+        @self.app.route('/users', methods=['POST'])
+        @self.io.from_body('user', UserSchema)
+        def create_user(user):
+            return self.io.created(user, UserSchema())
+
+        @self.app.route('/text')
+        def text():
+            return self.app.response_class('plain', mimetype='text/plain')
+
+    def batch(self, items):
+        headers = {'Authorization': 'token'}
+        response = self.client.post('/batch', data=json.dumps(items), headers=headers)
+        return response.status_code, json.loads(response.get_data(as_text=True))
+
+    def test_batch(self):
+        self.io.add_batch_endpoint()
+
+        status, data = self.batch([
+            dict(path='/users/foo'),
+            dict(method='POST', path='/users', body=dict(username='bar')),
+            dict(method='POST', path='/users', body=dict(username=1)),
+            dict(path='/text'),
+            dict(path='/unknown'),
+            dict(method='POST', path='/batch', body=[]),
+        ])
+
+        self.assertEqual(200, status)
+        self.assertEqual(dict(status=200, body=dict(username='foo', token='token')), data[0])
+        self.assertEqual(dict(status=201, body=dict(username='bar')), data[1])
+        self.assertEqual(400, data[2]['status'])
+        self.assertEqual('username', data[2]['body']['errors'][0]['field'])
+        self.assertEqual(dict(status=200, body='plain'), data[3])
+        self.assertEqual(dict(status=404, body=None), data[4])
+        self.assertEqual(400, data[5]['status'])
+
+    def test_parallel(self):
+        self.io.add_batch_endpoint(parallel=True, max_workers=2)
+
+        status, data = self.batch([dict(path='/users/user%d' % i) for i in range(5)])
+
+        self.assertEqual(['user%d' % i for i in range(5)], [item['body']['username'] for item in data])
+
+    def test_before_request(self):
+        self.io.add_batch_endpoint()
+
+        @self.app.route('/admin/users/<username>')
+        def get_admin_user(username):
+            return dict(username=username)
+
+        @self.app.before_request
+        def guard():
+            if request.path.startswith('/admin'):
+                abort(403)
+
+        self.processed = []
+
+        @self.app.after_request
+        def after(response):
+            self.processed.append(request.path)
+            return response
+
+        status, data = self.batch([dict(path='/admin/users/foo'), dict(path='/users/foo')])
+
+        self.assertEqual(200, status)
+        self.assertEqual(403, data[0]['status'])
+        self.assertNotIn('foo', str(data[0]['body']))
+        self.assertEqual(200, data[1]['status'])
+        self.assertEqual(['/admin/users/foo', '/users/foo', '/batch'], self.processed)
+
+    def test_compression(self):
+        self.app.config['COMPRESSION_ENABLED'] = True
+        self.app.config['COMPRESSION_THRESHOLD'] = 0
+        self.io.init_app(self.app)
+        self.io.add_batch_endpoint()
+
+        status, data = self.batch([dict(path='/users/foo', headers={'Accept-Encoding': 'gzip'})])
+
+        self.assertEqual(200, status)
+        self.assertEqual(dict(status=200, body=dict(username='foo', token='token')), data[0])
+
+    def test_unhandled_error(self):
+        self.io.add_batch_endpoint()
+
+        @self.app.route('/error')
+        def error():
+            return dict(value=1)
+
+        # raised outside of the FlaskIO error handling.
+        @self.app.before_request
+        def fail():
+            if request.path == '/error':
+                raise ValueError('expected error in test_unhandled_error')
+
+        with self.assertLogs(self.app.logger, 'ERROR'):
+            status, data = self.batch([dict(path='/error'), dict(path='/users/foo')])
+
+        self.assertEqual(200, status)
+        self.assertEqual(dict(status=500, body=None), data[0])
+        self.assertEqual(200, data[1]['status'])
+
+    def test_close(self):
+        batch = self.io.add_batch_endpoint(parallel=True, max_workers=2)
+
+        self.batch([dict(path='/users/foo'), dict(path='/users/bar')])
+        batch.close()
+
+        # a new thread pool is created on demand.
+        status, data = self.batch([dict(path='/users/foo'), dict(path='/users/bar')])
+        self.assertEqual([200, 200], [item['status'] for item in data])
+
+    def test_max_items(self):
+        self.io.add_batch_endpoint(max_items=1)
+
+        status, data = self.batch([dict(path='/users/foo'), dict(path='/users/bar')])
+
+        self.assertEqual(400, status)
+
+    def test_invalid_item(self):
+        self.io.add_batch_endpoint()
+
+        status, data = self.batch([dict(method='GET')])
+
+        self.assertEqual(400, status)
+        self.assertEqual('path', data['errors'][0]['field'])
+
+
+class UserSchema(Schema):
+    username = fields.String()
+    token = fields.String()
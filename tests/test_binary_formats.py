@@ -0,0 +1,84 @@
+from datetime import datetime
+from flask import Flask
+from flask_io import fields, FlaskIO, Schema
+from flask_io.parsers import CBORParser, MsgPackParser
+from flask_io.renderers import CBORRenderer, MsgPackRenderer
+from unittest import TestCase, skipIf
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+class TestBinaryFormats(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+        @self.app.route('/users', methods=['POST'])
+        @self.io.marshal_with(UserSchema)
+        @self.io.from_body('user', UserSchema)
+        def test(user):
+            return user
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack(self):
+        self.io.default_parsers.append(MsgPackParser())
+        self.io.default_renderers.append(MsgPackRenderer())
+
+        data = msgpack.packb(dict(username='foo', created_at='2017-01-02T03:04:05'))
+
+        response = self.client.post('/users', data=data, headers={'Content-Type': 'application/msgpack',
+                                                                 'Accept': 'application/msgpack'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/msgpack', response.mimetype)
+        self.assertEqual(dict(username='foo', created_at='2017-01-02T03:04:05'),
+                         msgpack.unpackb(response.get_data(), raw=False))
+
+        response = self.client.post('/users', data=data, headers={'Content-Type': 'application/msgpack'})
+        self.assertEqual('application/json', response.mimetype)
+
+    @skipIf(cbor2 is None, 'cbor2 is not installed')
+    def test_cbor(self):
+        self.io.default_parsers.append(CBORParser())
+        self.io.default_renderers.append(CBORRenderer())
+
+        data = cbor2.dumps(dict(username='foo', created_at='2017-01-02T03:04:05'))
+
+        response = self.client.post('/users', data=data, headers={'Content-Type': 'application/cbor',
+                                                                 'Accept': 'application/cbor'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/cbor', response.mimetype)
+        self.assertEqual(dict(username='foo', created_at='2017-01-02T03:04:05'), cbor2.loads(response.get_data()))
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_malformed(self):
+        self.io.default_parsers.append(MsgPackParser())
+
+        response = self.client.post('/users', data=b'\xc1', headers={'Content-Type': 'application/msgpack'})
+        self.assertEqual(400, response.status_code)
+
+    @skipIf(msgpack is None or cbor2 is None, 'msgpack or cbor2 is not installed')
+    def test_memoryview(self):
+        data = dict(a=1, b=[1, 2])
+
+        self.assertEqual(data, MsgPackParser().parse(memoryview(msgpack.packb(data)), None))
+        self.assertEqual(data, CBORParser().parse(memoryview(cbor2.dumps(data)), None))
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_default_encoder(self):
+        data = msgpack.unpackb(MsgPackRenderer().render(dict(date=datetime(2017, 1, 2)), None), raw=False)
+        self.assertEqual('Mon, 02 Jan 2017 00:00:00 GMT', data['date'])
+
+
+class UserSchema(Schema):
+    username = fields.String()
+    created_at = fields.DateTime()
@@ -0,0 +1,162 @@
+import json
+
+from flask import Flask, request
+from flask_io import FlaskIO, fields
+from flask_io.authentication import Authenticator
+from flask_io.caching import MemoryCache
+from unittest import TestCase
+
+
+class TestResponseCache(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        response = self.client.get(url, **kwargs)
+        return response.status_code, json.loads(response.get_data(as_text=True))
+
+    def test_cache(self):
+        @self.app.route('/users/<username>')
+        @self.io.cache(ttl=60)
+        @self.io.from_query('limit', fields.Integer())
+        def test(username, limit):
+            self.calls += 1
+            return dict(username=username, calls=self.calls)
+
+        self.assertEqual((200, dict(username='foo', calls=1)), self.get('/users/foo'))
+        self.assertEqual((200, dict(username='foo', calls=1)), self.get('/users/foo'))
+        self.assertEqual((200, dict(username='bar', calls=2)), self.get('/users/bar'))
+
+        # the query string is part of the key
+        self.assertEqual((200, dict(username='foo', calls=3)), self.get('/users/foo?limit=1'))
+        self.assertEqual((200, dict(username='foo', calls=4)), self.get('/users/foo?limit=50'))
+        self.assertEqual((200, dict(username='foo', calls=3)), self.get('/users/foo?limit=1'))
+        self.assertEqual(400, self.get('/users/foo?limit=a')[0])
+
+        self.assertEqual(2, self.io.cache_backend.hits)
+
+    def test_vary_on(self):
+        @self.app.route('/resource')
+        @self.io.cache(vary_on=['query', 'header:X-Tenant'])
+        def test():
+            self.calls += 1
+            return dict(calls=self.calls)
+
+        self.assertEqual(1, self.get('/resource?a=1')[1]['calls'])
+        self.assertEqual(1, self.get('/resource?a=1')[1]['calls'])
+        self.assertEqual(2, self.get('/resource?a=2')[1]['calls'])
+        self.assertEqual(3, self.get('/resource?a=2', headers={'X-Tenant': '1'})[1]['calls'])
+        self.assertEqual(4, self.get('/resource?a=2', headers={'Accept': 'application/json;indent=2'})[1]['calls'])
+
+    def test_vary_on_user(self):
+        @self.app.route('/resource')
+        @self.io.authenticators(UserAuthenticator)
+        @self.io.cache(vary_on=['user:id'])
+        def test():
+            self.calls += 1
+            return dict(user=request.user.id, calls=self.calls)
+
+        # both users have the same string.
+        self.assertEqual(dict(user='1', calls=1), self.get('/resource', headers={'X-User': '1'})[1])
+        self.assertEqual(dict(user='2', calls=2), self.get('/resource', headers={'X-User': '2'})[1])
+        self.assertEqual(dict(user='1', calls=1), self.get('/resource', headers={'X-User': '1'})[1])
+
+    def test_errors_not_cached(self):
+        @self.app.route('/resource')
+        @self.io.cache()
+        def test():
+            self.calls += 1
+            return self.io.not_found('not found')
+
+        self.get('/resource')
+        self.get('/resource')
+
+        self.assertEqual(2, self.calls)
+
+    def test_invalidate(self):
+        @self.app.route('/users/<username>')
+        @self.io.cache(tags=['user:{username}'])
+        def test(username):
+            self.calls += 1
+            return dict(calls=self.calls)
+
+        self.get('/users/foo')
+        self.get('/users/bar')
+        self.io.invalidate_cache('user:foo')
+
+        self.assertEqual(3, self.get('/users/foo')[1]['calls'])
+        self.assertEqual(2, self.get('/users/bar')[1]['calls'])
+
+    def test_invalid_tag(self):
+        @self.app.route('/users/<username>')
+        @self.io.cache(tags=['user:{id}'])
+        def test(username):
+            self.calls += 1
+            return dict(calls=self.calls)
+
+        # the response is not cached but still returned.
+        with self.assertLogs('flask-io', 'ERROR'):
+            self.assertEqual((200, dict(calls=1)), self.get('/users/foo'))
+        with self.assertLogs('flask-io', 'ERROR'):
+            self.assertEqual((200, dict(calls=2)), self.get('/users/foo'))
+
+    def test_tags_pruned(self):
+        backend = MemoryCache(max_size=2)
+
+        for i in range(1000):
+            backend.set(i, 'entry', tags=['tag%d' % i, 'all'])
+
+        self.assertEqual(2, len(backend.entries))
+        self.assertEqual({'tag998', 'tag999', 'all'}, set(backend._MemoryCache__tags))
+        self.assertEqual({998, 999}, backend._MemoryCache__tags['all'])
+
+        # replaced with other tags.
+        backend.set(999, 'entry', tags=['other'])
+        self.assertEqual({'tag998', 'all', 'other'}, set(backend._MemoryCache__tags))
+
+        backend.invalidate('all')
+        self.assertEqual({'other'}, set(backend._MemoryCache__tags))
+        self.assertEqual('entry', backend.get(999))
+
+    def test_tags_pruned_on_expiry(self):
+        backend = MemoryCache(ttl=0)
+        backend.set('key', 'entry', tags=['tag'])
+
+        self.assertIsNone(backend.get('key'))
+        self.assertEqual({}, backend._MemoryCache__tags)
+
+    def test_ttl(self):
+        @self.app.route('/resource')
+        @self.io.cache(ttl=0)
+        def test():
+            self.calls += 1
+            return dict(calls=self.calls)
+
+        self.get('/resource')
+        self.get('/resource')
+
+        self.assertEqual(2, self.calls)
+
+    def test_invalid_vary_on(self):
+        with self.assertRaises(ValueError):
+            self.io.cache(vary_on=['unknown'])
+
+        with self.assertRaises(ValueError):
+            self.io.cache(vary_on=['user'])
+
+
+class User(object):
+    def __init__(self, id):
+        self.id = id
+
+    def __str__(self):
+        return 'user'
+
+
+class UserAuthenticator(Authenticator):
+    def authenticate(self):
+        return User(request.headers.get('X-User')), None
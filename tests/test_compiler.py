@@ -0,0 +1,307 @@
+import enum
+import uuid
+
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from flask_io import fields, post_dump, post_load, pre_dump, pre_load, Schema, ValidationError, validates
+from flask_io.compiler import CompiledDumper, CompiledLoader, compile_dumper, compile_loader
+from flask_io.validate import Length, MACAddress, OneOf
+from marshmallow import EXCLUDE, INCLUDE
+from unittest import TestCase
+
+
+class TestCompileDumper(TestCase):
+    def assertParity(self, schema, data, many=None):
+        dumper = compile_dumper(schema)
+        self.assertIsInstance(dumper, CompiledDumper)
+        self.assertEqual(schema.dump(data, many=many), dumper.dump(data, many=many))
+        return dumper
+
+    def test_simple_fields(self):
+        schema = SimpleSchema()
+
+        self.assertParity(schema, simple_dict())
+        self.assertParity(schema, SimpleObject(**simple_dict()))
+        self.assertParity(schema, [simple_dict(), SimpleObject(**simple_dict())], many=True)
+
+    def test_values_not_native(self):
+        schema = SimpleSchema()
+
+        data = dict(name=b'foo', age='10', score=1, active=1, kind=Kind.b.value, id=str(uuid.UUID(int=1)))
+        self.assertParity(schema, data)
+
+    def test_none_values(self):
+        schema = SimpleSchema()
+        self.assertParity(schema, {key: None for key in ('name', 'age', 'score', 'active', 'created_at', 'id')})
+
+    def test_missing_values(self):
+        self.assertParity(DefaultSchema(), {})
+        self.assertParity(DefaultSchema(), SimpleObject())
+        self.assertParity(DefaultSchema(), dict(items=1))
+
+    def test_namedtuple(self):
+        Point = namedtuple('Point', 'x y')
+        self.assertParity(PointSchema(), Point(1, 2))
+
+    def test_data_key_and_attribute(self):
+        self.assertParity(KeySchema(), dict(first_name='foo', last='bar', address=dict(city='x')))
+
+    def test_fallback_fields(self):
+        dumper = self.assertParity(FallbackSchema(), dict(name='foo', address=dict(city='x')))
+        self.assertEqual([None, None, None], [entry[4] for entry in dumper.plan[1:]])
+
+    def test_nested(self):
+        data = dict(name='foo', child=dict(name='bar'), children=[dict(name='a'), dict(name='b')], tags=['a', 1],
+                    dates=[date(2017, 1, 1)])
+
+        self.assertParity(ParentSchema(), data)
+        self.assertParity(ParentSchema(), dict(name='foo', child=None, children=None, tags=None))
+        self.assertParity(ParentSchema(only=['child.name', 'children']), data)
+
+    def test_self_nested(self):
+        data = dict(name='a', parent=dict(name='b', parent=dict(name='c')))
+        self.assertParity(TreeSchema(), data)
+
+    def test_ordered(self):
+        dumper = self.assertParity(OrderedSchema(), dict(b=1, a=2))
+        self.assertEqual(['b', 'a'], list(dumper.dump(dict(b=1, a=2)).keys()))
+
+    def test_many(self):
+        self.assertParity(SimpleSchema(many=True), [simple_dict()])
+        self.assertParity(SimpleSchema(many=True), None)
+
+    def test_hooks_not_compiled(self):
+        self.assertIsInstance(compile_dumper(HookSchema()), HookSchema)
+        self.assertIsInstance(compile_dumper(PostHookSchema()), PostHookSchema)
+
+    def test_nested_not_registered(self):
+        schema = UnregisteredParentSchema()
+        self.assertIs(schema, compile_dumper(schema))
+
+    def test_nested_with_hooks(self):
+        self.assertParity(HookParentSchema(), dict(child=dict(name='foo')))
+
+
+class TestCompileLoader(TestCase):
+    def assertParity(self, schema, data, many=None):
+        loader = compile_loader(schema)
+        self.assertIsInstance(loader, CompiledLoader)
+
+        try:
+            expected = schema.load(data, many=many)
+        except ValidationError as e:
+            with self.assertRaises(ValidationError) as context:
+                loader.load(data, many=many)
+            self.assertEqual(e.messages, context.exception.messages)
+        else:
+            self.assertEqual(expected, loader.load(data, many=many))
+
+    def test_valid(self):
+        data = dict(name=' foo ', code='ab', number='123', age=10, kind='a', id=str(uuid.UUID(int=1)),
+                    id_text=str(uuid.UUID(int=2)), tags='a,b,c', mac='00:11:22:33:44:55', optional=None,
+                    created_at='2017-01-02T03:04:05', color='red')
+
+        self.assertParity(UserLoadSchema(), data)
+        self.assertParity(UserLoadSchema(), dict(name='foo', kind=Kind.b, age=1))
+        self.assertParity(UserLoadSchema(many=True), [data, dict(name='bar')])
+
+    def test_invalid(self):
+        invalid_values = [
+            dict(name=''), dict(name='   '), dict(name=None), dict(name=1), dict(code='a'), dict(code='abcdef'),
+            dict(number='12a'), dict(age='x'), dict(age=True), dict(kind='z'), dict(id='x'), dict(id_text='x'),
+            dict(tags='a,,b'), dict(mac='00:11'), dict(created_at='x'), dict(color='blue'), dict(unknown=1)
+        ]
+
+        for invalid in invalid_values:
+            data = dict(name='foo')
+            data.update(invalid)
+            self.assertParity(UserLoadSchema(), data)
+
+        self.assertParity(UserLoadSchema(), {})
+        self.assertParity(UserLoadSchema(), [])
+        self.assertParity(UserLoadSchema(many=True), dict(name='foo'))
+        self.assertParity(UserLoadSchema(many=True), [dict(name='foo'), dict(name='')])
+
+    def test_none_if_empty(self):
+        self.assertParity(EmptySchema(), dict(value='  ', nullable='  '))
+        self.assertParity(EmptySchema(), dict(value='x', nullable=''))
+
+    def test_unknown(self):
+        self.assertParity(UserLoadSchema(unknown=EXCLUDE), dict(name='foo', other=1))
+        self.assertParity(UserLoadSchema(unknown=INCLUDE), dict(name='foo', other=1))
+
+    def test_data_key_and_attribute(self):
+        self.assertParity(KeyLoadSchema(), dict(firstName='foo', city='bar'))
+
+    def test_nested(self):
+        self.assertParity(ParentSchema(), dict(name='foo', child=dict(name='bar'), children=[dict(name='a')]))
+        self.assertParity(ParentSchema(), dict(name='foo', child=dict(name=1)))
+
+    def test_post_load(self):
+        self.assertParity(PostLoadSchema(), dict(name='foo'))
+        self.assertParity(PostLoadSchema(), dict(name=1))
+        self.assertParity(PostLoadSchema(many=True), [dict(name='foo')])
+
+    def test_hooks_not_compiled(self):
+        self.assertIsInstance(compile_loader(PreLoadSchema()), PreLoadSchema)
+        self.assertIsInstance(compile_loader(ValidatesSchema()), ValidatesSchema)
+        self.assertIsInstance(compile_loader(UserLoadSchema(partial=True)), UserLoadSchema)
+
+
+class Kind(enum.Enum):
+    a = 'a'
+    b = 'b'
+
+
+class SimpleObject(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def simple_dict():
+    return dict(name='foo', age=10, score=1.5, active=True, created_at=datetime(2017, 1, 2, 3, 4, 5),
+                day=date(2017, 1, 2), id=uuid.UUID(int=1), kind=Kind.a, price=Decimal('1.50'), raw={'a': [1]},
+                email='foo@bar.com')
+
+
+class SimpleSchema(Schema):
+    name = fields.String()
+    age = fields.Integer()
+    age_text = fields.Integer(attribute='age', as_string=True, dump_only=True)
+    score = fields.Float()
+    active = fields.Boolean()
+    created_at = fields.DateTime()
+    day = fields.Date()
+    id = fields.UUID()
+    kind = fields.Enum(Kind)
+    price = fields.Decimal(as_string=True)
+    raw = fields.Raw()
+    email = fields.Email()
+
+
+class DefaultSchema(Schema):
+    name = fields.String(dump_default='unknown')
+    created_at = fields.DateTime(dump_default=lambda: datetime(2017, 1, 1))
+    age = fields.Integer()
+    items = fields.Raw()
+
+
+class PointSchema(Schema):
+    x = fields.Integer()
+    y = fields.Integer()
+
+
+class KeySchema(Schema):
+    first_name = fields.String(data_key='firstName')
+    last_name = fields.String(attribute='last')
+
+
+class FallbackSchema(Schema):
+    name = fields.String()
+    city = fields.String(attribute='address.city')
+    upper = fields.Function(lambda obj: obj['name'].upper())
+    method = fields.Method('get_method')
+
+    def get_method(self, obj):
+        return obj['name'] * 2
+
+
+class ChildSchema(Schema):
+    name = fields.String()
+    other = fields.String(dump_default='x')
+
+
+class ParentSchema(Schema):
+    name = fields.String()
+    child = fields.Nested(ChildSchema)
+    children = fields.Nested(ChildSchema, many=True)
+    tags = fields.List(fields.String())
+    dates = fields.List(fields.Date())
+
+
+class TreeSchema(Schema):
+    name = fields.String()
+    parent = fields.Nested(lambda: TreeSchema())
+
+
+class OrderedSchema(Schema):
+    class Meta:
+        ordered = True
+
+    b = fields.Integer()
+    a = fields.Integer()
+
+
+class HookSchema(Schema):
+    name = fields.String()
+
+    @pre_dump
+    def add_name(self, data, **kwargs):
+        return dict(name='hook')
+
+
+class PostHookSchema(Schema):
+    name = fields.String()
+
+    @post_dump
+    def upper(self, data, **kwargs):
+        data['name'] = data['name'].upper()
+        return data
+
+
+class HookParentSchema(Schema):
+    child = fields.Nested(PostHookSchema)
+
+
+class UnregisteredParentSchema(Schema):
+    child = fields.Nested('UnregisteredChildSchema')
+
+
+class UserLoadSchema(Schema):
+    name = fields.String(required=True, allow_empty=False, strip=True)
+    code = fields.String(upper=True, validate=Length(2, 5))
+    number = fields.String(only_numeric=True)
+    age = fields.Integer()
+    kind = fields.Enum(Kind)
+    id = fields.UUID()
+    id_text = fields.UUID(as_text=True)
+    tags = fields.DelimitedList(fields.String(allow_empty=False))
+    mac = fields.String(validate=MACAddress())
+    optional = fields.String(allow_none=True)
+    created_at = fields.DateTime()
+    color = fields.String(validate=OneOf(['red', 'green']))
+
+
+class EmptySchema(Schema):
+    value = fields.String(strip=True, none_if_empty=True)
+    nullable = fields.String(none_if_empty=True, allow_none=True)
+
+
+class KeyLoadSchema(Schema):
+    first_name = fields.String(data_key='firstName')
+    address_city = fields.String(data_key='city', attribute='address.city')
+
+
+class PostLoadSchema(Schema):
+    name = fields.String()
+
+    @post_load
+    def make_object(self, data, **kwargs):
+        return SimpleObject(**data).__dict__
+
+
+class PreLoadSchema(Schema):
+    name = fields.String()
+
+    @pre_load
+    def strip(self, data, **kwargs):
+        return data
+
+
+class ValidatesSchema(Schema):
+    name = fields.String()
+
+    @validates('name')
+    def validate_name(self, value, **kwargs):
+        pass
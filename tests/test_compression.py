@@ -0,0 +1,116 @@
+import gzip
+
+from flask import Flask, json
+from flask_io import FlaskIO, fields
+from flask_io.compression import GzipCodec, get_available_codecs, select_codec
+from marshmallow import Schema
+from unittest import TestCase
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+
+class TestCompression(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['COMPRESSION_ENABLED'] = True
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.io.compression_codecs = [GzipCodec()]
+        self.client = self.app.test_client()
+
+    def test_compressed(self):
+        @self.app.route('/resource')
+        def test():
+            return dict(value='x' * 2000)
+
+        response = self.client.get('/resource', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(b'{"value": "' + b'x' * 2000 + b'"}', gzip.decompress(response.get_data()))
+
+    def test_not_accepted(self):
+        @self.app.route('/resource')
+        def test():
+            return dict(value='x' * 2000)
+
+        for accept_encoding in (None, 'identity', 'gzip;q=0'):
+            headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+            response = self.client.get('/resource', headers=headers)
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_below_threshold(self):
+        @self.app.route('/resource')
+        def test():
+            return dict(value='value')
+
+        response = self.client.get('/resource', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(b'{"value": "value"}', response.get_data())
+
+    def test_disabled(self):
+        self.io.compression_codecs = []
+
+        @self.app.route('/resource')
+        def test():
+            return dict(value='x' * 2000)
+
+        response = self.client.get('/resource', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertNotIn('Vary', response.headers)
+
+    def test_stream(self):
+        class ItemSchema(Schema):
+            id = fields.Integer()
+
+        @self.app.route('/items')
+        @self.io.marshal_with(ItemSchema, stream=True, chunk_size=10)
+        def test():
+            return ({'id': i} for i in range(25))
+
+        response = self.client.get('/items', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+
+        items = json.loads(gzip.decompress(response.get_data()))
+        self.assertEqual([{'id': i} for i in range(25)], items)
+
+    def test_cached_variants(self):
+        calls = []
+
+        @self.app.route('/resource')
+        @self.io.cache(ttl=60)
+        def test():
+            calls.append(1)
+            return dict(value='x' * 2000)
+
+        for _ in range(2):
+            response = self.client.get('/resource', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual('gzip', response.headers['Content-Encoding'])
+
+            response = self.client.get('/resource')
+            self.assertNotIn('Content-Encoding', response.headers)
+
+        self.assertEqual(2, len(calls))
+
+
+class TestSelectCodec(TestCase):
+    def test_quality(self):
+        codecs = [_Codec('br'), _Codec('zstd'), GzipCodec()]
+
+        self.assertEqual('br', select_codec(parse_accept_header('gzip, br', Accept), codecs).name)
+        self.assertEqual('gzip', select_codec(parse_accept_header('gzip, br;q=0.5', Accept), codecs).name)
+        self.assertEqual('br', select_codec(parse_accept_header('*', Accept), codecs).name)
+        self.assertIsNone(select_codec(parse_accept_header('deflate', Accept), codecs))
+        self.assertIsNone(select_codec(parse_accept_header('', Accept), codecs))
+
+    def test_available_codecs(self):
+        codecs = get_available_codecs({'gzip': 9})
+        self.assertEqual('gzip', codecs[-1].name)
+        self.assertEqual(9, codecs[-1].level)
+
+
+class _Codec(GzipCodec):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
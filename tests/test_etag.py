@@ -0,0 +1,70 @@
+from flask import Flask
+from flask_io import FlaskIO
+from unittest import TestCase
+
+
+class TestETag(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+        self.calls = 0
+
+    def test_generated_etag(self):
+        self.io.etag_enabled = True
+
+        @self.app.route('/resource')
+        def test():
+            return dict(value='value')
+
+        response = self.client.get('/resource')
+        etag = response.headers['ETag']
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get('/resource', headers={'If-None-Match': etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.get_data())
+        self.assertEqual(etag, response.headers['ETag'])
+
+        response = self.client.get('/resource', headers={'If-None-Match': 'W/"other"'})
+        self.assertEqual(200, response.status_code)
+
+    def test_disabled(self):
+        @self.app.route('/resource')
+        def test():
+            return dict(value='value')
+
+        response = self.client.get('/resource')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_etag_up_front(self):
+        @self.app.route('/users/<username>')
+        @self.io.etag(lambda username: 'v1-' + username)
+        def test(username):
+            self.calls += 1
+            return dict(username=username), 200, {'X-Custom': 'value'}
+
+        response = self.client.get('/users/foo')
+        self.assertEqual('W/"v1-foo"', response.headers['ETag'])
+        self.assertEqual('value', response.headers['X-Custom'])
+
+        response = self.client.get('/users/foo', headers={'If-None-Match': 'W/"v1-foo"'})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(1, self.calls)
+
+        response = self.client.get('/users/bar', headers={'If-None-Match': 'W/"v1-foo"'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, self.calls)
+
+    def test_post_ignored(self):
+        self.io.etag_enabled = True
+
+        @self.app.route('/resource', methods=['POST'])
+        def test():
+            return dict(value='value')
+
+        response = self.client.post('/resource')
+        self.assertNotIn('ETag', response.headers)
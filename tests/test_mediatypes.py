@@ -42,3 +42,30 @@ class TestMimeType(TestCase):
         mimetype2 = MimeType.parse('application/json ;encoding=utf-8')
         self.assertTrue(mimetype.match(mimetype2))
         self.assertTrue(mimetype2.match(mimetype))
+
+    def test_parse_interned(self):
+        mimetype = MimeType.parse('application/json; indent=2')
+        mimetype2 = MimeType.parse('application/json; indent=2')
+        self.assertIs(mimetype, mimetype2)
+
+    def test_immutable(self):
+        mimetype = MimeType.parse('application/json; indent=2')
+
+        with self.assertRaises(AttributeError):
+            mimetype.sub_type = 'xml'
+
+        with self.assertRaises(TypeError):
+            mimetype.params['indent'] = '4'
+
+    def test_hashable(self):
+        mimetype = MimeType('application', 'json', {'indent': '2'})
+        mimetype2 = MimeType.parse('application/json;indent=2')
+
+        self.assertEqual(mimetype, mimetype2)
+        self.assertEqual({mimetype: 'value'}[mimetype2], 'value')
+        self.assertNotEqual(mimetype, MimeType.parse('application/json'))
+
+    def test_replace_same_values(self):
+        mimetype = MimeType.parse('application/json')
+        self.assertIs(mimetype, mimetype.replace(params={}))
+        self.assertEqual('application/json; indent=2', str(mimetype.replace(params={'indent': '2'})))
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+
+from flask import Flask
+from flask_io import FlaskIO, Schema, fields
+from flask_io.metrics import FileStore, MetricsRegistry
+from threading import Thread
+from unittest import TestCase
+
+
+class UserSchema(Schema):
+    username = fields.String(required=True)
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['METRICS_ENABLED'] = True
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.io.add_metrics_endpoint()
+        self.client = self.app.test_client()
+
+    def test_counts(self):
+        @self.app.route('/users', methods=['POST'])
+        @self.io.from_body('user', UserSchema)
+        @self.io.marshal_with(UserSchema)
+        def test(user):
+            return user
+
+        self.client.post('/users', data='{"username": "foo"}', content_type='application/json')
+        self.client.post('/users', data='{"username": "foo"}', content_type='application/json')
+        self.client.post('/users', data='{}', content_type='application/json')
+
+        metrics = self.io.metrics.collect()['test']
+
+        self.assertEqual({'200': {'application/json': 2}, '400': {'application/json': 1}}, metrics['requests'])
+        self.assertEqual(3, metrics['latency']['count'])
+        self.assertEqual(['auth', 'marshal', 'parse', 'render', 'view'], sorted(metrics['phases']))
+        self.assertEqual(2, metrics['phases']['view']['count'])
+        self.assertEqual(3, metrics['phases']['render']['count'])
+
+    def test_disabled(self):
+        self.io.metrics.enabled = False
+
+        @self.app.route('/resource')
+        def test():
+            return dict(value=1)
+
+        self.client.get('/resource')
+
+        self.assertEqual({}, self.io.metrics.collect())
+
+    def test_exposition(self):
+        @self.app.route('/resource')
+        def test():
+            return dict(value=1)
+
+        self.client.get('/resource')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/plain', response.mimetype)
+
+        text = response.get_data(as_text=True)
+        self.assertIn('flask_io_requests_total{endpoint="test",mimetype="application/json",status="200"} 1', text)
+        self.assertIn('flask_io_request_duration_seconds_bucket{endpoint="test",le="+Inf"} 1', text)
+        self.assertIn('flask_io_request_duration_seconds_count{endpoint="test"} 1', text)
+        self.assertIn('flask_io_phase_duration_seconds_count{endpoint="test",phase="view"} 1', text)
+
+    def test_label_escaping(self):
+        registry = MetricsRegistry()
+        registry.observe('a"b\\c\nd', 200, None, 0.01, {})
+
+        self.assertIn('endpoint="a\\"b\\\\c\\nd"', registry.render())
+
+    def test_buckets(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe('test', 200, None, 0.05, {})
+        registry.observe('test', 200, None, 0.5, {})
+        registry.observe('test', 200, None, 5.0, {})
+
+        text = registry.render()
+        self.assertIn('flask_io_request_duration_seconds_bucket{endpoint="test",le="0.1"} 1', text)
+        self.assertIn('flask_io_request_duration_seconds_bucket{endpoint="test",le="1.0"} 2', text)
+        self.assertIn('flask_io_request_duration_seconds_bucket{endpoint="test",le="+Inf"} 3', text)
+        self.assertIn('flask_io_request_duration_seconds_sum{endpoint="test"} 5.55', text)
+
+
+class TestFileStore(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_aggregate(self):
+        registry = MetricsRegistry(store=FileStore(self.directory))
+        registry.observe('test', 200, 'application/json', 0.01, {'view': 0.005})
+
+        # the snapshot written by another process.
+        other = MetricsRegistry()
+        other.observe('test', 200, 'application/json', 0.02, {'view': 0.01})
+        other.observe('test', 404, 'application/json', 0.02, {})
+        FileStore(os.path.join(self.directory, 'other')).flush(other)
+        shutil.move(os.path.join(self.directory, 'other', 'metrics-%d.json' % os.getpid()),
+                    os.path.join(self.directory, 'metrics-0.json'))
+
+        text = registry.render()
+        self.assertIn('flask_io_requests_total{endpoint="test",mimetype="application/json",status="200"} 2', text)
+        self.assertIn('flask_io_requests_total{endpoint="test",mimetype="application/json",status="404"} 1', text)
+        self.assertIn('flask_io_phase_duration_seconds_count{endpoint="test",phase="view"} 2', text)
+
+    def test_concurrent_flush(self):
+        registry = MetricsRegistry(store=FileStore(self.directory, flush_interval=0))
+        errors = []
+
+        def observe():
+            try:
+                for _ in range(50):
+                    registry.observe('test', 200, None, 0.01, {})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=observe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(['metrics-%d.json' % os.getpid()], os.listdir(self.directory))
+        self.assertIn('flask_io_requests_total{endpoint="test",mimetype="",status="200"} 400', registry.render())
+
+    def test_store_error(self):
+        store = FileStore(self.directory)
+        registry = MetricsRegistry(store=store)
+        shutil.rmtree(self.directory)
+
+        # the error is logged rather than raised.
+        with self.assertLogs('flask-io', 'ERROR'):
+            registry.observe('test', 200, None, 0.01, {})
+
+        self.assertEqual(1, registry.collect()['test']['latency']['count'])
@@ -0,0 +1,40 @@
+from flask import Flask, request
+from flask_io.negotiation import DefaultContentNegotiation
+from flask_io.renderers import JSONRenderer
+from unittest import TestCase
+
+
+class TestRendererCache(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.negotiation = DefaultContentNegotiation(cache_size=2)
+        self.renderers = [JSONRenderer()]
+
+    def select_renderer(self, accept):
+        with self.app.test_request_context(headers={'Accept': accept}):
+            return self.negotiation.select_renderer(request, self.renderers)
+
+    def test_cache_hit(self):
+        renderer, mimetype = self.select_renderer('application/json;indent=2')
+        renderer2, mimetype2 = self.select_renderer('application/json;indent=2')
+
+        self.assertIs(renderer, renderer2)
+        self.assertEqual(mimetype, mimetype2)
+        self.assertEqual('2', mimetype2.params['indent'])
+        self.assertEqual(1, self.negotiation.renderer_cache.hits)
+        self.assertEqual(1, self.negotiation.renderer_cache.misses)
+
+    def test_not_acceptable_cached(self):
+        self.assertEqual((None, None), self.select_renderer('application/data'))
+        self.assertEqual((None, None), self.select_renderer('application/data'))
+        self.assertEqual(1, self.negotiation.renderer_cache.hits)
+
+    def test_eviction(self):
+        self.select_renderer('application/json')
+        self.select_renderer('application/*')
+        self.select_renderer('*/*')
+
+        self.assertEqual(2, len(self.negotiation.renderer_cache))
+
+        self.select_renderer('application/json')
+        self.assertEqual(4, self.negotiation.renderer_cache.misses)
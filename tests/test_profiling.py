@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import time
+
+from collections import Counter
+from flask import Flask
+from flask_io import FlaskIO
+from flask_io.profiling import CollapsedStackSink, Profile, Profiler
+from flask_io.utils import Stopwatch
+from unittest import TestCase
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['PROFILE_ENABLED'] = True
+        self.app.config['PROFILE_INTERVAL'] = 0.001
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+        self.profiles = []
+        self.io.profiler.sink = self.profiles.append
+
+    def test_slow_threshold(self):
+        self.io.profiler.slow_threshold = 0.02
+
+        @self.app.route('/fast')
+        def fast():
+            return dict(value=1)
+
+        @self.app.route('/slow')
+        def slow():
+            time.sleep(0.1)
+            return dict(value=1)
+
+        self.client.get('/fast')
+        self.assertEqual([], self.profiles)
+
+        self.client.get('/slow')
+        self.io.profiler.close()
+        self.assertEqual(1, len(self.profiles))
+
+        profile = self.profiles[0]
+        self.assertEqual('slow', profile.endpoint)
+        self.assertGreaterEqual(profile.latency, 0.1)
+
+        stack, samples = profile.stacks.most_common(1)[0]
+        self.assertTrue(stack.split(';')[-1].startswith('slow ('))
+        self.assertGreater(samples, 0)
+
+    def test_sample_rate(self):
+        self.io.profiler.sample_rate = 1.0
+
+        @self.app.route('/resource')
+        def test():
+            time.sleep(0.02)
+            return dict(value=1)
+
+        self.client.get('/resource')
+        self.io.profiler.close()
+
+        self.assertEqual(1, len(self.profiles))
+        self.assertIn('test (', self.profiles[0].collapsed())
+
+    def test_not_profiled(self):
+        @self.app.route('/resource')
+        def test():
+            time.sleep(0.02)
+            return dict(value=1)
+
+        self.client.get('/resource')
+        self.io.profiler.close()
+
+        self.assertEqual([], self.profiles)
+
+    def test_overhead(self):
+        # the sampling time never exceeds the cap of the wall time.
+        self.io.profiler.sample_rate = 1.0
+        self.io.profiler.max_overhead = 0.01
+
+        @self.app.route('/resource')
+        def test():
+            time.sleep(0.05)
+            return dict(value=1)
+
+        started_at = time.perf_counter()
+        self.client.get('/resource')
+        wall_time = time.perf_counter() - started_at
+
+        self.assertLessEqual(self.io.profiler.sampling_time, wall_time * 0.01 + 0.001)
+
+    def test_nested(self):
+        profiler = Profiler(self.io, interval=0.001, sample_rate=1.0)
+        profiler.sink = self.profiles.append
+
+        # a request dispatched within another one on the same thread.
+        outer = profiler.start(Stopwatch.start_new())
+        inner = profiler.start(Stopwatch.start_new())
+        time.sleep(0.02)
+
+        inner.latency.stop()
+        self.assertIsNotNone(profiler.stop(inner, 'inner'))
+
+        samples = sum(outer.stacks.values())
+        time.sleep(0.02)
+        self.assertGreater(sum(outer.stacks.values()), samples)
+
+        outer.latency.stop()
+        self.assertIsNotNone(profiler.stop(outer, 'outer'))
+        profiler.close()
+
+        self.assertEqual(['inner', 'outer'], [profile.endpoint for profile in self.profiles])
+
+
+class TestCollapsedStackSink(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write(self):
+        sink = CollapsedStackSink(self.directory)
+        sink(Profile('test', 0.5, Counter({'main (a.py:1);view (b.py:2)': 3, 'main (a.py:1)': 1})))
+
+        file_names = os.listdir(self.directory)
+        self.assertEqual(1, len(file_names))
+        self.assertTrue(file_names[0].startswith('test-'))
+        self.assertTrue(file_names[0].endswith('.folded'))
+
+        with open(os.path.join(self.directory, file_names[0])) as f:
+            self.assertEqual('main (a.py:1);view (b.py:2) 3\nmain (a.py:1) 1\n', f.read())
+
+    def test_max_files(self):
+        sink = CollapsedStackSink(self.directory, max_files=2)
+
+        for endpoint in ('first', 'second', 'third'):
+            sink(Profile(endpoint, 0.5, Counter({'main (a.py:1)': 1})))
+            time.sleep(0.01)
+
+        file_names = sorted(os.listdir(self.directory))
+        self.assertEqual(2, len(file_names))
+        self.assertTrue(file_names[0].startswith('second-'))
+        self.assertTrue(file_names[1].startswith('third-'))
+
+
+class TestStopwatch(TestCase):
+    def test_peek(self):
+        stopwatch = Stopwatch.start_new()
+        time.sleep(0.01)
+
+        self.assertGreaterEqual(stopwatch.peek(), 0.01)
+        self.assertTrue(stopwatch.running)
+
+        stopwatch.stop()
+        self.assertEqual(stopwatch.elapsed, stopwatch.peek())
@@ -2,7 +2,11 @@ import json
 
 from flask import Flask
 from flask_io import FlaskIO, fields, post_load, Schema
+from flask_io.mimetypes import MimeType
+from flask_io.parsers import Parser
+from io import BytesIO
 from unittest import TestCase
+from werkzeug.test import EnvironBuilder, run_wsgi_app
 
 
 class TestRequestBody(TestCase):
@@ -50,6 +54,25 @@ class TestRequestBody(TestCase):
         response = self.client.post('/resource', data=json.dumps(data), headers=headers)
         self.assertEqual(response.status_code, 204)
 
+    def test_custom_parser(self):
+        class TextParser(Parser):
+            mimetype = MimeType.parse('text/plain')
+
+            def parse(self, data, mimetype):
+                username, password = data.decode('utf-8').split(':')
+                return dict(username=username, password=password)
+
+        self.io.default_parsers.append(TextParser())
+
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.from_body('user', UserSchema)
+        def test(user):
+            self.assertEqual(user.username, 'user1')
+
+        headers = {'content-type': 'text/plain'}
+        response = self.client.post('/resource', data='user1:pass1', headers=headers)
+        self.assertEqual(response.status_code, 204)
+
     def test_missing_payload(self):
         @self.app.route('/resource', methods=['POST'])
         @self.io.from_body('user', UserSchema)
@@ -103,6 +126,197 @@ class TestRequestBody(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class TestRequestBodyMany(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+        self.usernames = []
+
+        @self.app.route('/users', methods=['POST'])
+        @self.io.from_body_many('users', UserSchema, chunk_size=2)
+        def test(users):
+            for user in users:
+                self.assertEqual(type(user), User)
+                self.usernames.append(user.username)
+
+    def test_json_array(self):
+        data = [dict(username='user%d' % i, password='pass%d' % i) for i in range(5)]
+
+        response = self.client.post('/users', data=json.dumps(data), headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(['user0', 'user1', 'user2', 'user3', 'user4'], self.usernames)
+
+    def test_ndjson(self):
+        data = '\n'.join(json.dumps(dict(username='user%d' % i, password='pass%d' % i)) for i in range(3)) + '\n\n'
+
+        response = self.client.post('/users', data=data, headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(['user0', 'user1', 'user2'], self.usernames)
+
+    def test_lazy_errors_with_index(self):
+        data = [dict(username='user%d' % i, password='pass%d' % i) for i in range(5)]
+        data[3]['password'] = 'p'
+
+        response = self.client.post('/users', data=json.dumps(data), headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(['user0', 'user1'], self.usernames)
+
+        errors = json.loads(response.get_data(as_text=True))['errors']
+        self.assertEqual([dict(message='Invalid value.', location='body', field='password', index=3)], errors)
+
+    def test_not_an_array(self):
+        response = self.client.post('/users', data=json.dumps(dict(username='user1')),
+                                    headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 400)
+
+        errors = json.loads(response.get_data(as_text=True))['errors']
+        self.assertEqual('body', errors[0]['location'])
+
+    def test_malformed_ndjson(self):
+        data = '\n'.join(json.dumps(dict(username='user%d' % i, password='pass%d' % i)) for i in range(2)) + '\ninvalid'
+
+        response = self.client.post('/users', data=data, headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(['user0', 'user1'], self.usernames)
+
+
+class TestNDJSONStream(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['NDJSON_MAX_LINE_SIZE'] = 64
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def test_read_incrementally(self):
+        lines = [json.dumps(dict(username='user%d' % i, password='pass%d' % i)).encode() for i in range(100)]
+        data = b'\n'.join(lines)
+        stream = BytesIO(data)
+        positions = []
+
+        @self.app.route('/users', methods=['POST'])
+        @self.io.from_body_many('users', UserSchema, chunk_size=10)
+        def test(users):
+            for _ in users:
+                positions.append(stream.tell())
+
+        response = self.client.post('/users', input_stream=stream, content_length=len(data),
+                                    headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(100, len(positions))
+        self.assertLess(positions[0], len(data) / 2)
+        self.assertEqual(len(data), positions[-1])
+
+    def test_line_too_large(self):
+        @self.app.route('/users', methods=['POST'])
+        @self.io.from_body_many('users', UserSchema)
+        def test(users):
+            list(users)
+
+        data = json.dumps(dict(username='user' * 20, password='pass1'))
+
+        response = self.client.post('/users', data=data, headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 413)
+
+        data = json.dumps(dict(username='user1', password='pass1')) + '\r\n'
+
+        response = self.client.post('/users', data=data, headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 204)
+
+
+class TestBodySize(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['MAX_BODY_SIZE'] = 100
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+        self.users = []
+
+        @self.app.route('/users', methods=['POST'])
+        @self.io.from_body('user', UserSchema)
+        def test(user):
+            self.users.append(user)
+
+        @self.app.route('/large', methods=['POST'])
+        @self.io.from_body('user', UserSchema, max_size=1000)
+        def test_large(user):
+            self.users.append(user)
+
+        @self.app.route('/many', methods=['POST'])
+        @self.io.from_body_many('users', UserSchema)
+        def test_many(users):
+            self.users.extend(users)
+
+    def test_content_length(self):
+        data = json.dumps(dict(username='user1' * 30, password='pass1'))
+
+        response = self.client.post('/users', data=data, headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual([], self.users)
+
+        response = self.client.post('/large', data=data, headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 204)
+
+        response = self.client.post('/users', data=json.dumps(dict(username='user1', password='pass1')),
+                                    headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 204)
+
+    def test_without_content_length(self):
+        stream = BytesIO(json.dumps(dict(username='user1' * 30, password='pass1')).encode())
+
+        self.assertEqual('413 REQUEST ENTITY TOO LARGE', self.post_chunked('/users', stream, 'application/json'))
+        self.assertEqual(101, stream.tell())
+
+        stream = BytesIO(json.dumps(dict(username='user1', password='pass1')).encode())
+
+        self.assertEqual('204 NO CONTENT', self.post_chunked('/users', stream, 'application/json'))
+        self.assertEqual('user1', self.users[0].username)
+
+    def test_without_content_length_traced(self):
+        self.io.tracer.enabled = True
+        self.io.tracer.max_body_size = 10
+        self.bodies = []
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.bodies.append(data.get('request_body'))
+
+        data = json.dumps(dict(username='user1', password='pass1'))
+
+        self.assertEqual('204 NO CONTENT', self.post_chunked('/users', BytesIO(data.encode()), 'application/json'))
+        self.assertEqual('413 REQUEST ENTITY TOO LARGE',
+                         self.post_chunked('/users', BytesIO(b'{"username": "' + b'a' * 200 + b'"}'), 'application/json'))
+
+        # the body read and cached by the request is captured, the one rejected is not.
+        self.assertEqual([data[:10] + '...', None], self.bodies)
+
+    def test_ndjson_stream(self):
+        lines = [json.dumps(dict(username='user%d' % i, password='pass%d' % i)) for i in range(5)]
+
+        response = self.client.post('/many', data='\n'.join(lines[:2]), headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(2, len(self.users))
+
+        response = self.client.post('/many', data='\n'.join(lines), headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 413)
+
+        stream = BytesIO('\n'.join(lines).encode())
+        self.assertEqual('413 REQUEST ENTITY TOO LARGE', self.post_chunked('/many', stream, 'application/x-ndjson'))
+
+    def post_chunked(self, path, stream, content_type):
+        environ = EnvironBuilder(path, method='POST', content_type=content_type).get_environ()
+        environ.pop('CONTENT_LENGTH', None)
+        environ['HTTP_TRANSFER_ENCODING'] = 'chunked'
+        environ['wsgi.input'] = stream
+        environ['wsgi.input_terminated'] = True
+
+        _, status, _ = run_wsgi_app(self.app, environ, buffered=True)
+        return status
+
+
 class User(object):
     def __init__(self, username, password):
         self.username = username
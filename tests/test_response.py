@@ -1,8 +1,11 @@
 import json
 
+from datetime import datetime
 from flask import Flask, abort
 from flask_io import fields, FlaskIO, Error, Schema
-from unittest import TestCase
+from flask_io.backends import get_json_backend
+from importlib.util import find_spec
+from unittest import TestCase, skipUnless
 
 
 class TestResponseStatus(TestCase):
@@ -84,6 +87,68 @@ class TestResponseStatus(TestCase):
         self.assertEqual('foo', users_data.get('username'))
         self.assertIsNone(users_data.get('password'))
 
+    def test_fields_param_cached(self):
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.marshal_with(UserSchema)
+        def test():
+            return dict(username='foo', password='foo_pass')
+
+        self.client.post('/resource?fields=password,username')
+        response = self.client.post('/resource?fields=username,password,unknown')
+
+        self.assertEqual(dict(username='foo', password='foo_pass'), json.loads(response.get_data(as_text=True)))
+        self.assertEqual(1, len(self.io.schema_cache))
+        self.assertEqual(1, self.io.schema_cache.hits)
+
+    def test_nested_fields_param(self):
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.marshal_with(GroupSchema)
+        def test():
+            return dict(name='group', owner=dict(username='foo', password='foo_pass'))
+
+        response = self.client.post('/resource?fields=owner.username')
+        self.assertEqual(dict(owner=dict(username='foo')), json.loads(response.get_data(as_text=True)))
+
+        response = self.client.post('/resource?fields=name,owner.unknown')
+        self.assertEqual(dict(name='group'), json.loads(response.get_data(as_text=True)))
+
+        response = self.client.post('/resource?fields=owner.username,owner.unknown')
+        self.assertEqual(dict(owner=dict(username='foo')), json.loads(response.get_data(as_text=True)))
+
+    def test_invalid_nested_fields_param(self):
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.marshal_with(GroupSchema)
+        def test():
+            return dict(name='group', owner=dict(username='foo', password='foo_pass'))
+
+        group = dict(name='group', owner=dict(username='foo', password='foo_pass'))
+
+        # like an unknown field, the whole object is returned when no field requested is valid.
+        for fields_param in ('unknown', 'owner.unknown', 'name.foo', 'owner.username.foo'):
+            response = self.client.post('/resource?fields=%s' % fields_param)
+            self.assertEqual(group, json.loads(response.get_data(as_text=True)))
+
+        # a dotted path on a field which is not nested is unknown.
+        response = self.client.post('/resource?fields=name.foo,owner.username')
+        self.assertEqual(dict(owner=dict(username='foo')), json.loads(response.get_data(as_text=True)))
+
+    def test_forward_referenced_schema(self):
+        class TeamSchema(Schema):
+            name = fields.String()
+            lead = fields.Nested('ForwardMemberSchema')
+
+        # the nested schema is defined after the decorator is applied.
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.marshal_with(TeamSchema)
+        def test():
+            return dict(name='team', lead=dict(username='foo'))
+
+        class ForwardMemberSchema(Schema):
+            username = fields.String()
+
+        response = self.client.post('/resource')
+        self.assertEqual(dict(name='team', lead=dict(username='foo')), json.loads(response.get_data(as_text=True)))
+
     def test_http_exception(self):
         @self.app.route('/resource', methods=['GET'])
         def test():
@@ -94,6 +159,115 @@ class TestResponseStatus(TestCase):
         self.assertEqual(401, response.status_code)
 
 
+class TestStreaming(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def test_generator(self):
+        @self.app.route('/resource')
+        @self.io.marshal_with(UserSchema, stream=True, chunk_size=2)
+        def test():
+            return (dict(username='user%d' % i, password='pass') for i in range(5))
+
+        response = self.client.get('/resource')
+
+        self.assertEqual(200, response.status_code)
+        self.assertIsNone(response.content_length)
+
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(['user%d' % i for i in range(5)], [user['username'] for user in data])
+
+    def test_envelope(self):
+        @self.app.route('/resource')
+        @self.io.marshal_with(UserSchema, envelope='users', stream=True)
+        def test():
+            return iter([])
+
+        response = self.client.get('/resource')
+
+        self.assertEqual(dict(users=[]), json.loads(response.get_data(as_text=True)))
+
+    def test_single_object(self):
+        @self.app.route('/resource')
+        @self.io.marshal_with(UserSchema, envelope='user', stream=True)
+        def test():
+            return dict(username='foo')
+
+        response = self.client.get('/resource')
+
+        self.assertIsNotNone(response.content_length)
+        self.assertEqual(dict(user=dict(username='foo')), json.loads(response.get_data(as_text=True)))
+
+
+class TestJSONBackend(TestCase):
+    def test_config(self):
+        app = Flask(__name__)
+        app.config['JSON_BACKEND'] = 'stdlib'
+        io = FlaskIO(app)
+
+        self.assertEqual('stdlib', io.json_backend.name)
+        self.assertIs(io.json_backend, io.default_renderers[0].backend)
+        self.assertIs(io.json_backend, io.default_parsers[0].backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            FlaskIO(json_backend='unknown')
+
+    @skipUnless(find_spec('orjson'), 'orjson is not installed')
+    def test_orjson(self):
+        app = Flask(__name__)
+        io = FlaskIO(app, json_backend='orjson')
+        client = app.test_client()
+
+        @app.route('/resource', methods=['POST'])
+        @io.from_body('user', UserSchema)
+        @io.marshal_with(UserSchema)
+        def test(user):
+            return user
+
+        data = json.dumps(dict(username='foo', password='foo_pass'))
+        headers = {'content-type': 'application/json', 'accept': 'application/json; indent=2'}
+        response = client.post('/resource', data=data, headers=headers)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(dict(username='foo', password='foo_pass'), json.loads(response.get_data(as_text=True)))
+        self.assertIn(b'\n  ', response.get_data())
+
+    @skipUnless(find_spec('orjson'), 'orjson is not installed')
+    def test_orjson_parity(self):
+        app = Flask(__name__)
+        data = dict(updated=datetime(2020, 1, 2, 3, 4, 5), name='foo', created=datetime(2019, 1, 2).date())
+
+        with app.app_context():
+            expected = get_json_backend('stdlib').dumps(data)
+            actual = get_json_backend('orjson').dumps(data)
+
+        self.assertEqual(json.loads(expected), json.loads(actual))
+        self.assertEqual('Thu, 02 Jan 2020 03:04:05 GMT', json.loads(actual)['updated'])
+        self.assertEqual(list(json.loads(expected)), list(json.loads(actual)))
+
+    @skipUnless(find_spec('orjson'), 'orjson is not installed')
+    def test_orjson_without_json_provider(self):
+        app = Flask(__name__)
+
+        # the apps of Flask < 2.2 have no JSON provider.
+        del app.json
+
+        with app.app_context():
+            self.assertEqual(b'{"a":1,"b":2}', get_json_backend('orjson').dumps(dict(b=2, a=1)))
+
+            app.config['JSON_SORT_KEYS'] = False
+            self.assertEqual(b'{"b":2,"a":1}', get_json_backend('orjson').dumps(dict(b=2, a=1)))
+
+
 class UserSchema(Schema):
     username = fields.String()
     password = fields.String()
+
+
+class GroupSchema(Schema):
+    name = fields.String()
+    owner = fields.Nested(UserSchema)
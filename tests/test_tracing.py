@@ -1,6 +1,18 @@
+import gc
+import json
+
 from flask import Flask
-from flask_io import FlaskIO
+from flask_io import FlaskIO, Schema, fields
+from flask_io.tracing import BackgroundEmitter, JSONLinesEmitter
+from io import StringIO
+from threading import Event
+from time import monotonic
 from unittest import TestCase
+from weakref import ref
+
+
+class UserSchema(Schema):
+    username = fields.String(required=True)
 
 
 class TestTrace(TestCase):
@@ -79,6 +91,24 @@ class TestTrace(TestCase):
 
         self.assertEqual(self.steps, 1)
 
+    def test_match_deprecated(self):
+        self.io.tracer.add_filter(endpoints=['test2'])
+
+        @self.app.route('/test1')
+        def test1():
+            pass
+
+        @self.app.route('/test2')
+        def test2():
+            pass
+
+        rules = {rule.endpoint: rule for rule in self.app.url_map.iter_rules()}
+
+        with self.assertWarns(DeprecationWarning):
+            self.assertFalse(self.io.tracer.match(rules['test1']))
+        with self.assertWarns(DeprecationWarning):
+            self.assertTrue(self.io.tracer.match(rules['test2']))
+
     def test_filter_methods(self):
         self.io.tracer.add_filter(['POST'])
         self.steps = 0
@@ -102,3 +132,277 @@ class TestTrace(TestCase):
         self.assertEqual(response.status_code, 204)
 
         self.assertEqual(self.steps, 1)
+
+    def test_background(self):
+        self.batches = []
+
+        @self.app.route('/resource')
+        def test():
+            pass
+
+        class Emitter(object):
+            def __call__(emitter, data):
+                self.batches.append([data])
+
+            def emit_batch(emitter, batch):
+                self.batches.append(batch)
+
+        self.io.tracer.emitter = Emitter()
+        self.io.tracer.background = BackgroundEmitter(self.io.tracer, batch_size=2, flush_interval=60)
+
+        for _ in range(3):
+            self.client.get('/resource')
+
+        self.io.tracer.background.close()
+
+        self.assertEqual([2, 1], [len(batch) for batch in self.batches])
+        self.assertEqual(3, self.io.tracer.background.emitted)
+
+    def test_background_drop(self):
+        background = BackgroundEmitter(self.io.tracer, max_queue_size=1, batch_size=1, flush_interval=60)
+
+        # the worker thread is kept busy by blocking the emitter.
+        event = Event()
+        self.io.tracer.emitter = lambda data: event.wait()
+
+        background.put(1)
+        while background.put(2):
+            pass
+
+        self.assertEqual(1, background.dropped)
+
+        event.set()
+        background.close()
+        self.assertEqual(0, background.failed)
+
+    def test_background_close_full_queue(self):
+        background = BackgroundEmitter(self.io.tracer, max_queue_size=1, batch_size=1, flush_interval=60)
+
+        event = Event()
+        self.io.tracer.emitter = lambda data: event.wait()
+
+        background.put(1)
+        while background.put(2):
+            pass
+
+        # the stop marker does not fit in the queue, close gives up after the timeout.
+        started_at = monotonic()
+        background.close(timeout=0.05)
+        self.assertLess(monotonic() - started_at, 1)
+
+        event.set()
+
+    def test_background_collected(self):
+        # the emitters never started are not kept alive until exit.
+        background = ref(BackgroundEmitter(self.io.tracer))
+        gc.collect()
+
+        self.assertIsNone(background())
+
+    def test_sample_rate(self):
+        self.io.tracer.add_filter(endpoints=['test1'], sample_rate=0.0)
+        self.io.tracer.add_filter(endpoints=['test2'])
+        self.io.tracer.sample_rate = 1.0
+        self.steps = 0
+
+        @self.app.route('/test1')
+        def test1():
+            pass
+
+        @self.app.route('/test2')
+        def test2():
+            pass
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.steps += 1
+
+        for _ in range(3):
+            self.client.get('/test1')
+            self.client.get('/test2')
+
+        self.assertEqual(3, self.steps)
+
+    def test_trace_errors(self):
+        self.io.tracer.sample_rate = 0.0
+        self.io.tracer.trace_errors = True
+        self.steps = 0
+
+        @self.app.route('/ok')
+        def ok():
+            pass
+
+        @self.app.route('/error')
+        def error():
+            raise Exception('expected error in test_trace_errors')
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.steps += 1
+
+        self.client.get('/ok')
+        self.client.get('/error')
+
+        self.assertEqual(1, self.steps)
+
+    def test_rate_limit(self):
+        self.io.tracer.set_rate_limit(0.001, burst=2)
+        self.steps = 0
+
+        @self.app.route('/resource')
+        def test():
+            pass
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.steps += 1
+
+        for _ in range(5):
+            self.client.get('/resource')
+
+        self.assertEqual(2, self.steps)
+
+    def test_body_truncated(self):
+        self.io.tracer.max_body_size = 4
+        self.body = None
+
+        @self.app.route('/resource', methods=['POST'])
+        def test():
+            pass
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.body = data['request_body']
+
+        self.client.post('/resource', data='0123456789')
+
+        self.assertEqual('0123...', self.body)
+
+    def test_lazy_record(self):
+        self.data = None
+
+        @self.app.route('/resource', methods=['POST'])
+        def test():
+            pass
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.assertNotIn('error', data)
+            self.assertEqual('POST', data['request_method'])
+            self.assertEqual('http://localhost/resource', data.pop('request_url'))
+            self.assertNotIn('request_url', data)
+            data['entry'] = 'value'
+            self.data = dict(data)
+
+        self.client.post('/resource', data='body')
+
+        self.assertEqual(['latency', 'request_method', 'request_headers', 'request_body', 'response_status', 'timings',
+                          'entry'], list(self.data))
+        self.assertEqual('body', self.data['request_body'])
+
+    def test_json_lines_emitter(self):
+        stream = StringIO()
+        self.io.trace_emit('json', stream=stream, include_headers=['Authorization', 'X-Request-Id'])
+
+        @self.app.route('/resource', methods=['POST'])
+        def test():
+            pass
+
+        headers = {'Authorization': 'secret', 'X-Request-Id': '1', 'X-Other': 'value'}
+        self.client.post('/resource', data='body', headers=headers)
+
+        data = json.loads(stream.getvalue())
+
+        self.assertEqual('POST', data['request_method'])
+        self.assertEqual('body', data['request_body'])
+        self.assertEqual({'Authorization': '***', 'X-Request-Id': '1'}, data['request_headers'])
+
+    def test_emit_batch_to_logger(self):
+        emitter = JSONLinesEmitter()
+
+        # every tracing data is its own record, so each one is prefixed by the formatter.
+        with self.assertLogs('flask-io', 'INFO') as logs:
+            emitter.emit_batch([dict(latency=0.1), dict(latency=0.2)])
+
+        self.assertEqual([dict(latency=0.1), dict(latency=0.2)], [json.loads(record.getMessage())
+                                                                  for record in logs.records])
+
+    def test_logfmt_emitter(self):
+        stream = StringIO()
+        self.io.trace_emit('logfmt', stream=stream, exclude_headers=['User-Agent', 'Host'], redact=['request_body'])
+
+        @self.app.route('/resource', methods=['POST'])
+        def test():
+            pass
+
+        self.client.post('/resource', data='a body', headers={'X-Request-Id': 'a "b"'})
+
+        line = stream.getvalue().strip()
+
+        self.assertTrue(line.startswith('latency='))
+        self.assertIn(' request_method=POST request_url=http://localhost/resource ', line)
+        self.assertIn(' header.x-request-id="a \\"b\\"" ', line)
+        self.assertIn(' request_body=*** response_status=204', line)
+        self.assertNotIn('header.host', line)
+        self.assertIn(' timing.view=', line)
+
+    def test_timings(self):
+        self.data = None
+
+        @self.app.route('/resource', methods=['POST'])
+        @self.io.from_body('user', UserSchema)
+        @self.io.marshal_with(UserSchema)
+        def test(user):
+            return user
+
+        @self.io.trace_emit()
+        def trace_emit(data):
+            self.data = dict(data)
+
+        self.client.post('/resource', data='{"username": "foo"}', content_type='application/json')
+
+        self.assertEqual(['auth', 'auth.authentication', 'auth.permissions', 'marshal', 'parse', 'parse.body_read',
+                          'parse.parser', 'parse.schema_load', 'render', 'view'], sorted(self.data['timings']))
+        self.assertLessEqual(self.data['timings']['parse.schema_load'], self.data['timings']['parse'])
+        self.assertLessEqual(sum(self.data['timings'][phase] for phase in ('auth', 'parse', 'view', 'marshal', 'render')),
+                             self.data['latency'])
+
+
+class TestServerTiming(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SERVER_TIMING_ENABLED'] = True
+        self.io = FlaskIO()
+        self.io.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def test_header(self):
+        @self.app.route('/resource')
+        def test():
+            return dict(value=1)
+
+        response = self.client.get('/resource')
+
+        names = [metric.split(';')[0] for metric in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(['auth', 'auth.authentication', 'auth.permissions', 'parse', 'view', 'marshal', 'render',
+                          'total'], names)
+        self.assertRegex(response.headers['Server-Timing'], r'total;dur=\d+\.\d{3}$')
+
+    def test_error(self):
+        @self.app.route('/resource')
+        def test():
+            raise Exception('expected error in test_error')
+
+        response = self.client.get('/resource')
+
+        self.assertEqual(500, response.status_code)
+        self.assertIn('view;dur=', response.headers['Server-Timing'])
+
+    def test_disabled(self):
+        self.io.server_timing_enabled = False
+
+        @self.app.route('/resource')
+        def test():
+            return dict(value=1)
+
+        self.assertNotIn('Server-Timing', self.client.get('/resource').headers)